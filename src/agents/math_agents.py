@@ -2,6 +2,7 @@
 MathBookAgents - CrewAI agents for the AI Editorial Team.
 Streamlined to 3 agents: Pedagogue, Writer (math+illustrations), Editor.
 Temperature lowered to 0.3 for mathematical accuracy.
+Pedagogue and Editor run on a lighter model tier (LIGHT_MODEL).
 """
 
 import os
@@ -66,6 +67,7 @@ class MathBookAgents:
 
     def __init__(self, language_level: str = "standard"):
         model = os.getenv("PRIMARY_MODEL", "gemini-2.0-flash")
+        light_model = os.getenv("LIGHT_MODEL", "gemini-2.0-flash-lite")
         api_key = os.getenv("GOOGLE_API_KEY")
 
         # Temperature 0.3 for mathematical accuracy (was 0.7)
@@ -75,6 +77,14 @@ class MathBookAgents:
             temperature=0.3
         )
 
+        # Smaller, faster model for the structural work (planning + editing);
+        # the writer keeps the full model
+        self.llm_light = LLM(
+            model=f"gemini/{light_model}",
+            api_key=api_key,
+            temperature=0.2
+        )
+
         self.language_level = language_level
         self.language_instructions = get_language_level_instructions(language_level)
 
@@ -108,7 +118,7 @@ class MathBookAgents:
                 "Sørg for at ALT er NØYAKTIG tilpasset dette trinnet."
             ),
             backstory=backstory,
-            llm=self.llm,
+            llm=self.llm_light,
             verbose=True,
             allow_delegation=False
         )
@@ -116,11 +126,12 @@ class MathBookAgents:
     # ------------------------------------------------------------------
     # AGENT 2: Writer (merged mathematician + illustrator)
     # ------------------------------------------------------------------
-    def writer(self, grade: str = None) -> Agent:
+    def writer(self, grade: str = None, include_graphs: bool = True) -> Agent:
         """
         Combined mathematician and illustrator.
         Writes math content AND TikZ illustrations in one pass.
         No more [INSERT FIGURE] placeholders.
+        With include_graphs=False the TikZ instructions are left out of the prompt.
         """
         grade_context = ""
         difficulty_context = ""
@@ -146,15 +157,60 @@ class MathBookAgents:
                         difficulty_context += f"  {level.capitalize()}: {desc}\n"
 
         lang_block = self.language_instructions or ""
-        age_instructions = self._get_age_illustration_instructions(grade)
 
-        return Agent(
-            role="Matematiker, lærebokforfatter og illustratør",
-            goal=(
+        if include_graphs:
+            age_instructions = self._get_age_illustration_instructions(grade)
+            tikz_block = (
+                "=== TikZ OG GRAFER ===\n\n"
+
+                "Skriv TikZ-kode DIREKTE - aldri [INSERT FIGURE].\n"
+                f"{age_instructions}\n\n"
+
+                "TILGJENGELIGE TikZ-BIBLIOTEKER (allerede lastet i preamble):\n"
+                "arrows.meta, calc, patterns, positioning, shapes.geometric,\n"
+                "decorations.pathreplacing\n"
+                "IKKE bruk andre biblioteker - de er IKKE tilgjengelige.\n\n"
+
+                "Tilgjengelige farger i preamble:\n"
+                "mainBlue, lightBlue, mainGreen, lightGreen, mainOrange, lightOrange,\n"
+                "mainPurple, lightPurple, mainTeal, lightTeal, mainGray, lightGray\n\n"
+
+                "FIGUR-FORMAT (alltid):\n"
+                "\\begin{figure}[H]\n"
+                "\\centering\n"
+                "\\begin{tikzpicture}\n"
+                "...\n"
+                "\\end{tikzpicture}\n"
+                "\\caption{Norsk beskrivelse.}\n"
+                "\\end{figure}\n\n"
+
+                "FUNKSJONSGRAF:\n"
+                "\\begin{figure}[H]\n"
+                "\\centering\n"
+                "\\begin{tikzpicture}\n"
+                "\\begin{axis}[width=0.7\\textwidth, height=0.5\\textwidth,\n"
+                "  xlabel={$x$}, ylabel={$y$}, grid=major, axis lines=middle]\n"
+                "\\addplot[mainBlue, thick, domain=-4:4] {2*x+1};\n"
+                "\\end{axis}\n"
+                "\\end{tikzpicture}\n"
+                "\\caption{Grafen til $f(x)=2x+1$.}\n"
+                "\\end{figure}\n\n"
+            )
+            goal = (
                 f"Skriv komplett LaTeX-innhold for {grade or 'det valgte klassetrinnet'} "
                 "med matematikk, oppgaver OG TikZ-illustrasjoner direkte i teksten. "
                 "IKKE bruk [INSERT FIGURE]-plassholdere - skriv ferdig TikZ-kode med en gang."
-            ),
+            )
+        else:
+            tikz_block = "=== ILLUSTRASJONER ===\nINGEN ILLUSTRASJONER — ikke generer TikZ-kode.\n\n"
+            goal = (
+                f"Skriv komplett LaTeX-innhold for {grade or 'det valgte klassetrinnet'} "
+                "med matematikk og oppgaver, uten figurer eller TikZ-kode."
+            )
+
+        return Agent(
+            role="Matematiker, lærebokforfatter og illustratør",
+            goal=goal,
             backstory=(
                 "Du er en profesjonell matematiker og lærebokforfatter som også er ekspert "
                 "på TikZ og PGFPlots. Du skriver KOMPLETT innhold i én omgang: tekst, "
@@ -191,44 +247,11 @@ class MathBookAgents:
                 "\\item ...\n"
                 "\\end{enumerate}\n\n"
 
-                "=== TikZ OG GRAFER ===\n\n"
-
-                "Skriv TikZ-kode DIREKTE - aldri [INSERT FIGURE].\n"
-                f"{age_instructions}\n\n"
-
-                "TILGJENGELIGE TikZ-BIBLIOTEKER (allerede lastet i preamble):\n"
-                "arrows.meta, calc, patterns, positioning, shapes.geometric,\n"
-                "decorations.pathreplacing\n"
-                "IKKE bruk andre biblioteker - de er IKKE tilgjengelige.\n\n"
+                f"{tikz_block}"
 
                 "TILGJENGELIGE PAKKER: tikz, pgfplots (compat=1.18), "
                 "float, booktabs, enumitem, multicol, tcolorbox, siunitx, mathtools, bm\n\n"
 
-                "Tilgjengelige farger i preamble:\n"
-                "mainBlue, lightBlue, mainGreen, lightGreen, mainOrange, lightOrange,\n"
-                "mainPurple, lightPurple, mainTeal, lightTeal, mainGray, lightGray\n\n"
-
-                "FIGUR-FORMAT (alltid):\n"
-                "\\begin{figure}[H]\n"
-                "\\centering\n"
-                "\\begin{tikzpicture}\n"
-                "...\n"
-                "\\end{tikzpicture}\n"
-                "\\caption{Norsk beskrivelse.}\n"
-                "\\end{figure}\n\n"
-
-                "FUNKSJONSGRAF:\n"
-                "\\begin{figure}[H]\n"
-                "\\centering\n"
-                "\\begin{tikzpicture}\n"
-                "\\begin{axis}[width=0.7\\textwidth, height=0.5\\textwidth,\n"
-                "  xlabel={$x$}, ylabel={$y$}, grid=major, axis lines=middle]\n"
-                "\\addplot[mainBlue, thick, domain=-4:4] {2*x+1};\n"
-                "\\end{axis}\n"
-                "\\end{tikzpicture}\n"
-                "\\caption{Grafen til $f(x)=2x+1$.}\n"
-                "\\end{figure}\n\n"
-
                 "=== MATEMATIKK-FORMATERING ===\n"
                 "- \\frac{}{} for brøker, ALDRI a/b i display math\n"
                 "- \\cdot for multiplikasjon, ALDRI *\n"
@@ -325,7 +348,7 @@ class MathBookAgents:
                 "OUTPUT: Rent LaTeX body-innhold klart for kompilering.\n"
                 "VIKTIG: Alt innhold på norsk (Bokmål)."
             ),
-            llm=self.llm,
+            llm=self.llm_light,
             verbose=True,
             allow_delegation=False
         )
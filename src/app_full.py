@@ -5,11 +5,40 @@ Streamlined UI - Clean, focused, user-friendly.
 
 import os
 import base64
+import hashlib
+import json
 import logging
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
+from types import SimpleNamespace
 
 from dotenv import load_dotenv
+
+# Always-needed helpers, imported once (src.tools is loaded lazily, see _deps)
+from src.cache import (
+    TTL_LONG,
+    get_all_exercise_types,
+    get_cache_stats,
+    get_content_analysis,
+    get_coverage_report,
+    get_curriculum_goals,
+    get_curriculum_topics_flat,
+    get_history,
+    get_history_texes,
+    get_topic_suggestions_cached,
+    invalidate_exercises_cache,
+    invalidate_history_cache,
+)
+from src.curriculum import estimate_generation_time
+
 load_dotenv()
 
 import streamlit as st
@@ -83,13 +112,151 @@ TEMPLATES = {
     },
 }
 
+# Quick-start button labels, built once instead of on every rerun
+TEMPLATE_BUTTONS = tuple(
+    (key, f"{tmpl['emoji']} {tmpl['name']}") for key, tmpl in TEMPLATES.items()
+)
+
+# Grade options (label -> grade passed to the agents)
+GRADE_OPTIONS = {
+    "1.-4. trinn": "1-4. trinn",
+    "5.-7. trinn": "5-7. trinn",
+    "8. trinn": "8. trinn",
+    "9. trinn": "9. trinn",
+    "10. trinn": "10. trinn",
+    "VG1 1T": "VG1 1T",
+    "VG1 1P": "VG1 1P",
+    "VG2 2P": "VG2 2P",
+    "VG2 R1": "VG2 R1",
+    "VG3 R2": "VG3 R2",
+}
+GRADE_LABELS = tuple(GRADE_OPTIONS)
+
 # Difficulty mapping — robust, no string splitting
 DIFFICULTY_OPTIONS = {
     "🟢 Lett": "Lett",
     "🟡 Middels": "Middels",
     "🔴 Vanskelig": "Vanskelig",
 }
-DIFFICULTY_REVERSE = {v: k for k, v in DIFFICULTY_OPTIONS.items()}
+DIFFICULTY_LABELS = tuple(DIFFICULTY_OPTIONS)
+DIFFICULTY_INDEX = {value: i for i, value in enumerate(DIFFICULTY_OPTIONS.values())}
+
+# Language level options (label -> level code)
+LANGUAGE_OPTIONS = {"Standard norsk": "standard", "Forenklet (B2)": "b2", "Enklere (B1)": "b1"}
+LANGUAGE_LABELS = tuple(LANGUAGE_OPTIONS)
+LANGUAGE_INDEX = {code: i for i, code in enumerate(LANGUAGE_OPTIONS.values())}
+
+# Extra writer instructions: (session_state flag, value that triggers it, text)
+CONTENT_INSTRUCTION_RULES = (
+    ("include_theory", False, "IKKE inkluder teori eller definisjoner"),
+    ("include_examples", False, "IKKE inkluder eksempler"),
+    ("include_exercises", True, "Lag {num_exercises} oppgaver"),
+    ("differentiation_mode", True, "Lag tre nivåer: lett, middels, vanskelig"),
+)
+
+CUSTOM_TOPIC_LABEL = "✍️ Skriv eget tema..."
+
+# Anything except letters, digits, space, '-' and '_' is dropped from filenames
+_UNSAFE_FILENAME_CHARS_RE = re.compile(r"[^\w \-]")
+
+# Compiled PDFs keyed by LaTeX content hash (skips pdflatex on identical regenerations)
+PDF_CACHE_DIR = Path("output") / ".cache"
+PDF_CACHE_MAX_FILES = 50  # newest by mtime are kept, older ones pruned
+
+# TeX drops trailing blanks on every input line, so they can't change the PDF
+_TRAILING_BLANKS_RE = re.compile(r"[ \t]+$", re.MULTILINE)
+
+# Larger PDFs are not inlined in the preview (base64 adds ~33% to every rerun's payload)
+PDF_PREVIEW_MAX_BYTES = 2_000_000
+
+# Static header HTML (the status badge is filled in with the model name)
+HEADER_HTML = """
+<div style="text-align: center; padding: 2rem 0 1rem 0;">
+    <h1 style="
+        font-size: 2.5rem; font-weight: 800; margin: 0;
+        background: linear-gradient(135deg, #f8fafc 0%, #f59e0b 80%);
+        -webkit-background-clip: text; -webkit-text-fill-color: transparent;
+        letter-spacing: -1px;
+    ">◇ MateMaTeX</h1>
+    <p style="color: #94a3b8; font-size: 0.95rem; margin-top: 0.5rem;">
+        Generer matematikkoppgaver tilpasset norsk læreplan
+    </p>
+</div>
+"""
+API_STATUS_HTML = """
+<div style="text-align: center; margin-bottom: 1.5rem;">
+    <span style="
+        background: rgba(16,185,129,0.1); border: 1px solid rgba(16,185,129,0.25);
+        padding: 0.3rem 0.8rem; border-radius: 20px;
+        color: #10b981; font-size: 0.75rem;
+    ">● {model_name}</span>
+</div>
+"""
+
+FOOTER_HTML = """
+<div style="text-align: center; color: #64748b; font-size: 0.75rem; margin-top: 3rem; padding: 1rem 0;">
+    MateMaTeX &copy; 2026 &bull; <a href="https://www.crewai.com/" target="_blank" style="color: #f59e0b; text-decoration: none;">CrewAI</a>
+    + <a href="https://streamlit.io/" target="_blank" style="color: #f59e0b; text-decoration: none;">Streamlit</a>
+</div>
+"""
+
+
+# ============================================================================
+# LAZY DEPENDENCIES
+# ============================================================================
+@st.cache_resource(show_spinner=False)
+def _deps() -> SimpleNamespace:
+    """Import the heavy src.tools helpers once per process (raises if they can't load)."""
+    from src.tools import (
+        add_exercises,
+        compile_latex_to_pdf,
+        create_print_version,
+        ensure_preamble,
+        extract_exercises_from_latex,
+        generate_rubric,
+        rubric_to_markdown,
+        warm_preamble_format,
+    )
+    from src.tools.pdf_generator import clean_ai_output
+
+    try:
+        from src.tools import is_word_export_available, latex_to_word
+    except ImportError:
+        is_word_export_available = latex_to_word = None
+
+    return SimpleNamespace(
+        add_exercises=add_exercises,
+        clean_ai_output=clean_ai_output,
+        compile_latex_to_pdf=compile_latex_to_pdf,
+        create_print_version=create_print_version,
+        ensure_preamble=ensure_preamble,
+        extract_exercises_from_latex=extract_exercises_from_latex,
+        generate_rubric=generate_rubric,
+        is_word_export_available=is_word_export_available,
+        latex_to_word=latex_to_word,
+        rubric_to_markdown=rubric_to_markdown,
+        warm_preamble_format=warm_preamble_format,
+    )
+
+
+def _load_deps() -> SimpleNamespace | None:
+    """_deps(), or None if src.tools fails to import (failures are not cached)."""
+    try:
+        return _deps()
+    except Exception as e:
+        logger.error(f"Kunne ikke laste verktøy (src.tools): {e}")
+        return None
+
+
+@st.cache_resource(show_spinner=False)
+def _agent_factory(language_level: str):
+    """One MathBookAgents (and its LLM clients) per language level, reused across runs.
+
+    Only the factory is shared: the Agent objects it builds carry per-crew
+    state, so run_crew still creates fresh agents for every generation.
+    """
+    from src.agents import MathBookAgents
+    return MathBookAgents(language_level=language_level)
 
 
 # ============================================================================
@@ -101,6 +268,7 @@ def initialize_session_state():
         "latex_result": None,
         "pdf_path": None,
         "pdf_bytes": None,
+        "pdf_b64": None,
         "generation_complete": False,
         "generation_cancelled": False,
         "include_theory": True,
@@ -110,78 +278,205 @@ def initialize_session_state():
         "include_graphs": True,
         "include_tips": False,
         "difficulty_level": "Middels",
-        "selected_exercise_types": ["standard"],
+        "selected_exercise_types": {"standard"},
         "differentiation_mode": False,
         "num_exercises": 10,
         "selected_competency_goals": [],
         "selected_template": None,
         "language_level": "standard",
+        "fast_mode": True,
+        "_session_id": uuid.uuid4().hex,
         "_generating": False,
         "_last_filename": "",
         "word_bytes": None,
+        "print_pdf_bytes": None,
+        "show_pdf_preview": True,
     }
-    for key, value in defaults.items():
-        if key not in st.session_state:
-            st.session_state[key] = value
+    missing = defaults.keys() - st.session_state.keys()
+    if missing:
+        st.session_state.update({key: defaults[key] for key in missing})
+
+
+def set_state_if_changed(key: str, value) -> None:
+    """Write to session_state only when the value actually changes."""
+    if st.session_state.get(key) != value:
+        st.session_state[key] = value
 
 
 def apply_template(template_key: str):
     """Apply a template configuration."""
     if template_key in TEMPLATES:
-        config = TEMPLATES[template_key]["config"]
-        for key, value in config.items():
-            st.session_state[key] = value
-        st.session_state.selected_template = template_key
+        st.session_state.update(TEMPLATES[template_key]["config"], selected_template=template_key)
 
 
 # ============================================================================
 # CORE FUNCTIONS
 # ============================================================================
-def run_crew(grade: str, topic: str, material_type: str, instructions: str, content_options: dict) -> str:
+def _progress_callback(on_task_done: Callable[[int, int], None], total: int) -> Callable:
+    """CrewAI task_callback that reports on_task_done(done, total) per finished task."""
+    finished = 0
+
+    def task_callback(_output) -> None:
+        nonlocal finished
+        finished += 1
+        on_task_done(finished, total)
+
+    return task_callback
+
+
+def run_crew(
+    grade: str, topic: str, material_type: str, instructions: str, content_options: dict,
+    on_task_done: Callable[[int, int], None] | None = None,
+) -> str:
     """
     Run the CrewAI editorial team to generate content.
     3 agents: Pedagogue → Writer → Editor (streamlined from 4).
+    Fast mode (default): Writer plans + writes in one call → Editor.
+    on_task_done(done, total) is called as each task finishes.
     """
     from crewai import Crew, Process
-    from src.agents import MathBookAgents
     from src.tasks import MathTasks
 
-    language_level = content_options.get("language_level", "standard")
-    agents = MathBookAgents(language_level=language_level)
+    agents = _agent_factory(content_options.get("language_level", "standard"))
     tasks = MathTasks()
 
-    # 3 agents (writer handles both math content + illustrations)
-    pedagogue = agents.pedagogue(grade=grade)
-    writer = agents.writer(grade=grade)
-    editor = agents.chief_editor()
-
     full_topic = f"{topic}\n\nTilleggsinstruksjoner: {instructions}" if instructions else topic
 
-    # 3 tasks (no separate graphics task — writer produces TikZ inline)
-    task1 = tasks.plan_content_task(pedagogue, grade, full_topic, material_type, content_options)
-    task2 = tasks.write_content_task(writer, task1, content_options)
-    task3 = tasks.edit_and_validate_task(editor, task2, content_options)
+    writer = agents.writer(grade=grade, include_graphs=content_options.get("include_graphs", True))
+    editor = agents.chief_editor()
 
+    if content_options.get("fast_mode", True):
+        # 2 tasks: writer emits <PLAN> + <CONTENT>, saving the pedagogue round trip
+        task1 = tasks.plan_and_write_task(writer, grade, full_topic, material_type, content_options)
+        task2 = tasks.edit_and_validate_task(editor, task1, content_options)
+        crew_agents = [writer, editor]
+        crew_tasks = [task1, task2]
+    else:
+        # 3 tasks (no separate graphics task — writer produces TikZ inline)
+        pedagogue = agents.pedagogue(grade=grade)
+        task1 = tasks.plan_content_task(pedagogue, grade, full_topic, material_type, content_options)
+        task2 = tasks.write_content_task(writer, task1, content_options)
+        task3 = tasks.edit_and_validate_task(editor, task2, content_options)
+        crew_agents = [pedagogue, writer, editor]
+        crew_tasks = [task1, task2, task3]
+
+    task_callback = _progress_callback(on_task_done, len(crew_tasks)) if on_task_done else None
     crew = Crew(
-        agents=[pedagogue, writer, editor],
-        tasks=[task1, task2, task3],
+        agents=crew_agents,
+        tasks=crew_tasks,
         process=Process.sequential,
-        verbose=True
+        verbose=True,
+        task_callback=task_callback
     )
 
     result = crew.kickoff()
     return result.raw if hasattr(result, 'raw') else str(result)
 
 
-def generate_pdf(latex_content: str, filename: str) -> str | None:
-    """Generate PDF from LaTeX content."""
-    from src.tools import compile_latex_to_pdf
+# Generated documents kept per process, keyed on the generation inputs
+DOCUMENT_CACHE_MAX = 64
+_document_cache_lock = threading.Lock()
+
+
+@st.cache_resource(show_spinner=False)
+def _document_cache() -> OrderedDict:
+    """LRU store of (created, document) for generate_latex_document."""
+    return OrderedDict()
+
+
+def generate_latex_document(
+    grade: str, topic: str, material_type: str, instructions: str, content_options: dict,
+    on_task_done: Callable[[int, int], None] | None = None,
+    session_id: str = "", new_variant: bool = False,
+) -> str:
+    """
+    Run the crew and return a complete, self-contained LaTeX document.
+
+    Cached per session on all generation inputs: regenerating with identical
+    settings within the hour returns the previous document instead of another
+    1–3 minute LLM round trip. new_variant skips the lookup (and replaces the
+    cached document), and other sessions never see it. Failed runs raise and
+    are not cached.
+    (A hand-rolled store rather than st.cache_data, because on_task_done
+    drives widgets created outside this function, which cache_data can't
+    replay on a hit.)
+    """
+    key = json.dumps(
+        [session_id, grade, topic, material_type, instructions, content_options],
+        sort_keys=True, default=list
+    )
+    cache = _document_cache()
+    with _document_cache_lock:
+        hit = None if new_variant else cache.get(key)
+        if hit and time.monotonic() - hit[0] < TTL_LONG:
+            cache.move_to_end(key)
+            return hit[1]
+
+    deps = _deps()
+    raw_result = run_crew(grade, topic, material_type, instructions, content_options, on_task_done)
+    # Clean AI output and wrap with the standard preamble so the .tex
+    # compiles as-is in Overleaf/pdflatex
+    document = deps.ensure_preamble(deps.clean_ai_output(raw_result))
+
+    with _document_cache_lock:
+        cache[key] = (time.monotonic(), document)
+        cache.move_to_end(key)
+        while len(cache) > DOCUMENT_CACHE_MAX:
+            cache.popitem(last=False)
+    return document
+
+
+def generate_pdf(latex_content: str, filename: str) -> tuple[str, bytes] | None:
+    """Generate PDF from LaTeX content, reusing a cached PDF for identical content.
+
+    Returns (path, bytes) so callers don't re-read the file just written.
+    """
+    deps = _deps()
+    # Keyed on the source with insignificant trailing whitespace removed, so
+    # a recompile after whitespace-only edits is a cache hit too
+    normalized = _TRAILING_BLANKS_RE.sub("", latex_content).rstrip()
+    content_hash = hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+    cached_pdf = PDF_CACHE_DIR / f"{content_hash}.pdf"
+    if cached_pdf.exists():
+        pdf_path = Path("output") / f"{filename}.pdf"
+        data = cached_pdf.read_bytes()
+        pdf_path.write_bytes(data)
+        try:
+            os.utime(cached_pdf)  # mark as recently used for pruning
+        except OSError:
+            pass
+        return str(pdf_path), data
+
     try:
-        return compile_latex_to_pdf(latex_content, filename)
+        pdf_path = deps.compile_latex_to_pdf(latex_content, filename)
     except (FileNotFoundError, RuntimeError) as e:
         st.error(f"PDF-kompilering feilet: {e}")
         return None
 
+    data = Path(pdf_path).read_bytes()
+    try:
+        PDF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cached_pdf.write_bytes(data)
+        _prune_pdf_cache()
+    except OSError as e:
+        logger.warning(f"Kunne ikke cache PDF: {e}")
+    return pdf_path, data
+
+
+def _prune_pdf_cache() -> None:
+    """Keep only the PDF_CACHE_MAX_FILES most recently used cached PDFs."""
+    entries = []
+    for cached in PDF_CACHE_DIR.glob("*.pdf"):
+        try:
+            entries.append((cached.stat().st_mtime, cached))
+        except OSError:
+            continue  # removed concurrently
+    if len(entries) <= PDF_CACHE_MAX_FILES:
+        return
+    entries.sort(reverse=True)
+    for _, cached in entries[PDF_CACHE_MAX_FILES:]:
+        cached.unlink(missing_ok=True)
+
 
 def save_tex_file(latex_content: str, filename: str) -> str:
     """Save LaTeX content to .tex file.
@@ -189,30 +484,382 @@ def save_tex_file(latex_content: str, filename: str) -> str:
     Ensures the saved file is a complete, self-contained LaTeX document
     that compiles in Overleaf/pdflatex by validating it has a preamble.
     """
-    from src.tools import ensure_preamble
-    from src.tools.pdf_generator import clean_ai_output
-    
     # Ensure the .tex file is always complete and self-contained
     if r'\documentclass' not in latex_content:
-        latex_content = ensure_preamble(clean_ai_output(latex_content))
+        deps = _deps()
+        latex_content = deps.ensure_preamble(deps.clean_ai_output(latex_content))
     
     output_dir = Path("output")
     output_dir.mkdir(exist_ok=True)
     tex_path = output_dir / f"{filename}.tex"
-    tex_path.write_text(latex_content, encoding="utf-8")
+
+    # Write to a temp file in the same directory and atomically swap it in,
+    # so a concurrent PDF compile never reads a half-written .tex file.
+    # Encoded once and written as bytes (no TextIOWrapper in the way).
+    # Created with os.open(..., 0o666) rather than NamedTemporaryFile, which
+    # is always 0600: the saved file keeps the umask-based mode open() gives
+    data = latex_content.encode("utf-8")
+    tmp_path = output_dir / f".{filename}.{uuid.uuid4().hex}.tmp"
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    try:
+        with os.fdopen(os.open(tmp_path, flags, 0o666), "wb") as tmp:
+            tmp.write(data)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp_path, tex_path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+        raise
     return str(tex_path)
 
 
-def make_safe_filename(topic: str, grade: str) -> str:
+# Side work (format warm-up, usage stats) runs off the script thread; a
+# single worker keeps the usage-stats writes in order.
+_BACKGROUND = ThreadPoolExecutor(max_workers=1, thread_name_prefix="matematex-bg")
+
+
+def _record_generation(
+    topic: str, grade: str, material_type: str,
+    tex_content: str, pdf_path: str | None,
+) -> None:
+    """Save a finished generation to history (on the script thread, before the rerun)."""
+    from src.storage import add_to_history
+
+    try:
+        add_to_history(
+            topic=topic, grade=grade, material_type=material_type,
+            tex_content=tex_content, pdf_path=pdf_path
+        )
+        invalidate_history_cache()
+    except Exception as e:
+        logger.warning(f"Kunne ikke lagre til historikk: {e}")
+
+
+def _record_usage(topic: str, grade: str, material_type: str, num_exercises: int) -> None:
+    """Update the usage stats for a finished generation (background worker)."""
+    from src.tools import record_generation
+
+    try:
+        record_generation(
+            topic=topic, grade=grade, material_type=material_type,
+            num_exercises=num_exercises
+        )
+    except Exception as e:
+        logger.warning(f"Kunne ikke registrere bruk: {e}")
+
+
+def result_artifacts() -> dict:
+    """Per-result store for values derived from latex_result.
+
+    Reset whenever latex_result changes (new generation or recompile), so the
+    results view computes each artifact once instead of on every rerun.
+    """
+    key = hash(st.session_state.latex_result)
+    if st.session_state.get("_artifacts_key") != key:
+        st.session_state._artifacts_key = key
+        st.session_state._artifacts = {}
+    return st.session_state._artifacts
+
+
+@st.cache_resource(show_spinner=False)
+def topic_choices_for_grade(grade: str) -> tuple[str, ...]:
+    """Selectbox options for a grade: the custom-topic entry plus all curriculum topics."""
+    return (CUSTOM_TOPIC_LABEL, *get_curriculum_topics_flat(grade))
+
+
+@st.cache_resource(show_spinner=False)
+def goal_choices_for_grade(grade: str) -> tuple[tuple[str, str], ...]:
+    """(goal, checkbox label) pairs for a grade, with labels cut to 80 characters."""
+    return tuple(
+        (goal, goal[:80] + "..." if len(goal) > 80 else goal)
+        for goal in get_curriculum_goals(grade)
+    )
+
+
+def make_safe_filename(topic: str, grade: str, timestamp: str | None = None) -> str:
     """Create a safe filename from topic and grade. Never returns empty."""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_topic = "".join(c for c in topic if c.isalnum() or c in (' ', '-', '_')).strip().replace(' ', '_')[:30]
+    timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_topic = _UNSAFE_FILENAME_CHARS_RE.sub("", topic).strip().replace(' ', '_')[:30]
     safe_grade = grade.replace(' ', '_').replace('.', '')
     if not safe_topic:
         safe_topic = "matematikk"
     return f"{safe_topic}_{safe_grade}_{timestamp}"
 
 
+# ============================================================================
+# RESULTS & HISTORY
+# ============================================================================
+@st.fragment
+def render_results():
+    """Results view for the latest generation.
+
+    A fragment: downloads, expanders and buttons in here rerun only this
+    section instead of the whole page (st.rerun() still reruns the app).
+    """
+    # Without src.tools the downloads still work; tool buttons are disabled
+    deps = _load_deps()
+    no_tools = deps is None
+
+    st.markdown("---")
+    st.success("Materiale generert!")
+
+    # The generation's timestamp, shared by all filenames below
+    ts = st.session_state.get("_last_ts") or datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    # C4: Use descriptive filenames
+    dl_basename = st.session_state.get("_last_filename") or f"matematikk_{ts[:8]}"
+
+    artifacts = result_artifacts()
+
+    # Download row
+    dl_col1, dl_col2, dl_col3 = st.columns(3)
+
+    with dl_col1:
+        st.download_button(
+            "📄 Last ned LaTeX",
+            data=st.session_state.latex_result,
+            file_name=f"{dl_basename}.tex",
+            mime="text/plain",
+            use_container_width=True
+        )
+
+    with dl_col2:
+        if st.session_state.pdf_bytes:
+            st.download_button(
+                "📕 Last ned PDF",
+                data=st.session_state.pdf_bytes,
+                file_name=f"{dl_basename}.pdf",
+                mime="application/pdf",
+                use_container_width=True
+            )
+        else:
+            st.button("📕 PDF", disabled=True, use_container_width=True, help="Krever pdflatex")
+
+    with dl_col3:
+        # C3: Persist Word export in session state
+        if st.session_state.get("word_bytes"):
+            st.download_button(
+                "📘 Last ned Word",
+                data=st.session_state.word_bytes,
+                file_name=f"{dl_basename}.docx",
+                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                use_container_width=True,
+            )
+        else:
+            try:
+                if deps and deps.latex_to_word and deps.is_word_export_available():
+                    if st.button("📘 Word (.docx)", use_container_width=True):
+                        with st.spinner("Konverterer til Word..."):
+                            output_path = Path("output") / f"{dl_basename}.docx"
+                            output_path.parent.mkdir(exist_ok=True)
+                            word_path = deps.latex_to_word(st.session_state.latex_result, str(output_path))
+                            if word_path and Path(word_path).exists():
+                                st.session_state.word_bytes = Path(word_path).read_bytes()
+                                st.rerun()
+                            else:
+                                st.warning("Word-konvertering feilet.")
+                else:
+                    st.button("📘 Word", disabled=True, use_container_width=True)
+            except ImportError:
+                st.button("📘 Word", disabled=True, use_container_width=True)
+
+    # C5: Better PDF preview with controls and fallback
+    # (the preview embeds the whole PDF in the page, so it can be switched off)
+    if st.session_state.pdf_bytes:
+        st.toggle("👁️ Vis PDF-forhåndsvisning", key="show_pdf_preview")
+    if (
+        st.session_state.pdf_bytes and st.session_state.show_pdf_preview
+        and len(st.session_state.pdf_bytes) > PDF_PREVIEW_MAX_BYTES
+    ):
+        size_mb = len(st.session_state.pdf_bytes) / 1_000_000
+        st.caption(f"PDF-en er for stor for forhåndsvisning ({size_mb:.1f} MB). Last ned filen for å se den.")
+    elif st.session_state.pdf_bytes and st.session_state.show_pdf_preview:
+        # Kept in the page DOM (Chromium shows no PDF viewer inside the
+        # sandboxed component iframe), and the PDF is embedded once: a second
+        # copy in a data: link only doubled the payload, and browsers block
+        # top-level data: navigation anyway
+        # Encoded once per PDF and kept in session state, so widget
+        # reruns neither re-encode nor re-hash the bytes
+        if st.session_state.pdf_b64 is None:
+            st.session_state.pdf_b64 = base64.b64encode(st.session_state.pdf_bytes).decode("ascii")
+        pdf_b64 = st.session_state.pdf_b64
+        st.markdown(
+            f'<div style="margin-top: 1rem;">'
+            f'<iframe src="data:application/pdf;base64,{pdf_b64}#toolbar=1&navpanes=0" '
+            'width="100%" height="700" style="border: 1px solid #334155; border-radius: 12px;">'
+            '</iframe></div>',
+            unsafe_allow_html=True
+        )
+
+    # LaTeX code viewer
+    with st.expander("👁️ Se LaTeX-kode"):
+        st.code(st.session_state.latex_result, language="latex")
+
+    # Re-compile after edit
+    with st.expander("✏️ Rediger og kompiler på nytt"):
+        edited = st.text_area(
+            "LaTeX", value=st.session_state.latex_result,
+            height=300, label_visibility="collapsed"
+        )
+        if st.button("🔄 Kompiler på nytt", use_container_width=True, disabled=no_tools):
+            if edited == st.session_state.latex_result and st.session_state.pdf_bytes:
+                # Unchanged source: the current PDF is already up to date
+                st.info("Ingen endringer å kompilere.")
+            else:
+                with st.spinner("Kompilerer..."):
+                    pdf = generate_pdf(edited, f"redigert_{ts}")
+                    if pdf:
+                        # Adopt the edit only once it compiled, so a failed
+                        # compile can be retried and .tex/PDF stay in step
+                        st.session_state.latex_result = edited
+                        st.session_state.pdf_path, st.session_state.pdf_bytes = pdf
+                        st.session_state.pdf_b64 = None
+                        st.rerun()
+
+    # ==============================================================
+    # C9: Surface useful tools that were built but not in the UI
+    # ==============================================================
+
+    # --- Difficulty analysis ---
+    with st.expander("📊 Vanskelighetsanalyse"):
+        try:
+            if "analysis" not in artifacts:
+                artifacts["analysis"] = get_content_analysis(st.session_state.latex_result)
+            analysis = artifacts["analysis"]
+            if analysis.total_exercises > 0:
+                ac1, ac2, ac3, ac4 = st.columns(4)
+                ac1.metric("🟢 Lett", analysis.easy_count)
+                ac2.metric("🟡 Middels", analysis.medium_count)
+                ac3.metric("🔴 Vanskelig", analysis.hard_count)
+                ac4.metric("⏱️ Est. tid", f"{analysis.estimated_time_minutes} min")
+                if analysis.recommendations:
+                    for rec in analysis.recommendations:
+                        st.caption(f"💡 {rec}")
+            else:
+                st.caption("Ingen oppgaver funnet å analysere.")
+        except Exception:
+            st.caption("Analyse ikke tilgjengelig.")
+
+    # --- Print-friendly version ---
+    with st.expander("🖨️ Utskriftsvennlig versjon"):
+        st.caption("Genererer en versjon med gråtoner, optimalisert for utskrift.")
+        if st.button("Lag utskriftsversjon", use_container_width=True, key="btn_print", disabled=no_tools):
+            try:
+                with st.spinner("Lager utskriftsversjon..."):
+                    print_latex = deps.create_print_version(st.session_state.latex_result)
+                    print_pdf = generate_pdf(print_latex, f"print_{ts[9:]}")
+                    if print_pdf:
+                        st.session_state.print_pdf_bytes = print_pdf[1]
+                    else:
+                        st.warning("Kunne ikke generere utskriftsversjon.")
+            except Exception as e:
+                st.warning(f"Feil: {e}")
+        if st.session_state.get("print_pdf_bytes"):
+            st.download_button(
+                "⬇️ Last ned utskriftsversjon",
+                data=st.session_state.print_pdf_bytes,
+                file_name=f"{dl_basename}_utskrift.pdf",
+                mime="application/pdf",
+                use_container_width=True,
+            )
+
+    # --- Exercise bank ---
+    with st.expander("🏦 Lagre til oppgavebank"):
+        st.caption("Ekstraher enkeltoppgaver og lagre dem for gjenbruk.")
+        if st.button("🔍 Finn og lagre oppgaver", use_container_width=True, key="btn_exbank", disabled=no_tools):
+            try:
+                extracted = deps.extract_exercises_from_latex(st.session_state.latex_result)
+                if extracted:
+                    topic = st.session_state.get("_last_topic", "Matematikk") or "Matematikk"
+                    grade_level = st.session_state.get("_last_grade", "8. trinn") or "8. trinn"
+                    created = deps.add_exercises([
+                        {
+                            "title": ex.get("title", "Oppgave"),
+                            "topic": topic,
+                            "grade_level": grade_level,
+                            "latex_content": ex.get("full_latex", ex.get("content", "")),
+                            "difficulty": ex.get("difficulty", "middels"),
+                            "solution": ex.get("solution"),
+                        }
+                        for ex in extracted
+                    ])
+                    invalidate_exercises_cache()
+                    st.success(f"Lagret {len(created)} oppgaver til oppgavebanken!")
+                else:
+                    st.info("Fant ingen oppgaver å ekstrahere.")
+            except Exception as e:
+                st.warning(f"Feil: {e}")
+
+    # --- Rubric generator ---
+    with st.expander("📋 Vurderingsrubrikk"):
+        st.caption("Generer en vurderingsmatrise basert på innholdet.")
+        if st.button("Lag rubrikk", use_container_width=True, key="btn_rubric", disabled=no_tools):
+            try:
+                rubric_topic = st.session_state.get("_last_topic", "Matematikk") or "Matematikk"
+                rubric_grade = st.session_state.get("_last_grade", "10. trinn") or "10. trinn"
+                rubric = deps.generate_rubric(
+                    topic=rubric_topic,
+                    grade_level=rubric_grade,
+                    num_exercises=st.session_state.num_exercises,
+                )
+                st.markdown(deps.rubric_to_markdown(rubric))
+            except Exception as e:
+                st.warning(f"Feil: {e}")
+
+    # --- LK20 coverage ---
+    with st.expander("🎯 LK20-dekning"):
+        st.caption("Sjekk hvilke kompetansemål innholdet dekker.")
+        try:
+            if "coverage" not in artifacts:
+                coverage_grade = st.session_state.get("_last_grade", "10. trinn") or "10. trinn"
+                artifacts["coverage"] = get_coverage_report(st.session_state.latex_result, coverage_grade)
+            st.markdown(artifacts["coverage"])
+        except Exception as e:
+            st.caption("LK20-analyse ikke tilgjengelig.")
+
+
+@st.fragment
+def render_history():
+    """Recent generations with .tex downloads (a fragment, like render_results)."""
+    try:
+        history = get_history()
+        if history:
+            with st.expander(f"📚 Tidligere genereringer ({len(history)})", expanded=False):
+                recent = list(islice(history, 10))
+                tex_by_id = get_history_texes(tuple(entry.id for entry in recent if entry.id))
+                for entry in recent:
+                    entry_topic = entry.topic or "Ukjent"
+                    entry_grade = entry.grade
+                    entry_type = entry.material_type
+                    entry_date = entry.timestamp
+                    if isinstance(entry_date, str) and len(entry_date) > 10:
+                        entry_date = entry_date[:10]
+
+                    col_info, col_action = st.columns([3, 1])
+                    with col_info:
+                        st.markdown(
+                            f"**{entry_topic}** — {entry_grade} · {entry_type}  \n"
+                            f"<small style='color:#64748b'>{entry_date}</small>",
+                            unsafe_allow_html=True
+                        )
+                    with col_action:
+                        entry_id = entry.id
+                        if entry_id:
+                            tex_content = tex_by_id.get(entry_id)
+                            if tex_content:
+                                st.download_button(
+                                    "⬇️ .tex",
+                                    data=tex_content,
+                                    file_name=f"{entry_topic[:20]}.tex",
+                                    mime="text/plain",
+                                    key=f"hist_{entry_id}",
+                                    use_container_width=True,
+                                )
+                    st.markdown("<hr style='margin:0.3rem 0;border-color:#1e293b'>", unsafe_allow_html=True)
+    except Exception:
+        pass  # History display is non-critical
+
+
 # ============================================================================
 # MAIN APPLICATION
 # ============================================================================
@@ -224,47 +871,29 @@ def main():
     model_name = os.getenv("PRIMARY_MODEL", "gemini-2.0-flash")
 
     # ------------------------------------------------------------------
-    # HEADER
+    # HEADER + API status (one markdown delta)
     # ------------------------------------------------------------------
-    st.markdown("""
-    <div style="text-align: center; padding: 2rem 0 1rem 0;">
-        <h1 style="
-            font-size: 2.5rem; font-weight: 800; margin: 0;
-            background: linear-gradient(135deg, #f8fafc 0%, #f59e0b 80%);
-            -webkit-background-clip: text; -webkit-text-fill-color: transparent;
-            letter-spacing: -1px;
-        ">◇ MateMaTeX</h1>
-        <p style="color: #94a3b8; font-size: 0.95rem; margin-top: 0.5rem;">
-            Generer matematikkoppgaver tilpasset norsk læreplan
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
-
-    # API status - minimal
     if api_configured:
-        st.markdown(f"""
-        <div style="text-align: center; margin-bottom: 1.5rem;">
-            <span style="
-                background: rgba(16,185,129,0.1); border: 1px solid rgba(16,185,129,0.25);
-                padding: 0.3rem 0.8rem; border-radius: 20px;
-                color: #10b981; font-size: 0.75rem;
-            ">● {model_name}</span>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(HEADER_HTML + API_STATUS_HTML.format(model_name=model_name), unsafe_allow_html=True)
     else:
+        st.markdown(HEADER_HTML, unsafe_allow_html=True)
         st.error("API-nøkkel mangler. Legg til GOOGLE_API_KEY i miljøvariablene.")
         return
 
+    deps = _load_deps()
+    if deps is None:
+        st.warning("Verktøyene for LaTeX/PDF kunne ikke lastes. Generering er slått av; se loggen.")
+
     # ------------------------------------------------------------------
     # STEP 1: Quick-start templates
     # ------------------------------------------------------------------
     st.markdown("##### Hurtigstart")
     cols = st.columns(4)
-    for i, (key, tmpl) in enumerate(TEMPLATES.items()):
+    for i, (key, label) in enumerate(TEMPLATE_BUTTONS):
         with cols[i]:
             is_selected = st.session_state.selected_template == key
             if st.button(
-                f"{tmpl['emoji']} {tmpl['name']}",
+                label,
                 key=f"tmpl_{key}",
                 use_container_width=True,
                 type="primary" if is_selected else "secondary",
@@ -277,47 +906,27 @@ def main():
     # ------------------------------------------------------------------
     # STEP 2: Grade + Topic (the two most important choices)
     # ------------------------------------------------------------------
-    from src.cache import get_curriculum_topics
-
-    grade_options = {
-        "1.-4. trinn": "1-4. trinn",
-        "5.-7. trinn": "5-7. trinn",
-        "8. trinn": "8. trinn",
-        "9. trinn": "9. trinn",
-        "10. trinn": "10. trinn",
-        "VG1 1T": "VG1 1T",
-        "VG1 1P": "VG1 1P",
-        "VG2 2P": "VG2 2P",
-        "VG2 R1": "VG2 R1",
-        "VG3 R2": "VG3 R2",
-    }
-
     col_grade, col_topic = st.columns([1, 2])
 
     with col_grade:
         st.markdown("##### Klassetrinn")
         selected_grade = st.selectbox(
             "Klassetrinn",
-            options=list(grade_options.keys()),
+            options=GRADE_LABELS,
             index=4,
             label_visibility="collapsed"
         )
 
     with col_topic:
         st.markdown("##### Tema")
-        topics_by_category = get_curriculum_topics(selected_grade)
-        topic_choices = ["✍️ Skriv eget tema..."]
-        for _cat, topics_list in topics_by_category.items():
-            topic_choices.extend(topics_list)
-
         selected_topic_choice = st.selectbox(
             "Velg tema",
-            options=topic_choices,
+            options=topic_choices_for_grade(selected_grade),
             label_visibility="collapsed"
         )
 
     topic = ""
-    if selected_topic_choice == "✍️ Skriv eget tema...":
+    if selected_topic_choice == CUSTOM_TOPIC_LABEL:
         topic = st.text_input(
             "Skriv tema",
             placeholder="f.eks. Lineære funksjoner, Pytagoras, Brøk...",
@@ -325,8 +934,10 @@ def main():
         )
         # C9: Show topic suggestions from curriculum
         try:
-            from src.tools import get_topic_suggestions
-            suggestions = get_topic_suggestions(grade=selected_grade, current_topic=topic, num_suggestions=4)
+            # Under 3 characters the filter is just noise: keep the grade's
+            # default suggestions instead of a new lookup per keystroke
+            suggestion_filter = topic.strip() if len(topic.strip()) >= 3 else ""
+            suggestions = get_topic_suggestions_cached(selected_grade, suggestion_filter, 4)
             if suggestions:
                 st.caption("Forslag:")
                 suggestion_cols = st.columns(len(suggestions))
@@ -336,9 +947,9 @@ def main():
                             st.session_state._suggestion_topic = sug.get("topic", "")
                             st.rerun()
                 # Apply suggestion if one was clicked
-                if st.session_state.get("_suggestion_topic"):
-                    topic = st.session_state._suggestion_topic
-                    st.session_state._suggestion_topic = None
+                suggested_topic = st.session_state.pop("_suggestion_topic", None)
+                if suggested_topic:
+                    topic = suggested_topic
         except Exception:
             pass  # Topic suggestions are non-critical
     else:
@@ -351,127 +962,146 @@ def main():
     # ------------------------------------------------------------------
     # STEP 3: Content toggles - simple row
     # ------------------------------------------------------------------
-    st.markdown("---")
-    st.markdown("##### Innhold")
-
-    c1, c2, c3, c4, c5, c6 = st.columns(6)
-    with c1:
-        st.session_state.include_theory = st.checkbox("📘 Teori", value=st.session_state.include_theory)
-    with c2:
-        st.session_state.include_examples = st.checkbox("💡 Eksempler", value=st.session_state.include_examples)
-    with c3:
-        st.session_state.include_exercises = st.checkbox("✍️ Oppgaver", value=st.session_state.include_exercises)
-    with c4:
-        st.session_state.include_solutions = st.checkbox("🔑 Fasit", value=st.session_state.include_solutions)
-    with c5:
-        st.session_state.include_graphs = st.checkbox("📊 Grafer", value=st.session_state.include_graphs)
-    with c6:
-        st.session_state.include_tips = st.checkbox("💬 Tips", value=st.session_state.include_tips)
-
-    # Exercise count + difficulty (only if exercises enabled)
-    if st.session_state.include_exercises:
+    st.markdown("---\n\n##### Innhold")
+
+    # Content settings, advanced options and the generate button form one
+    # st.form: toggling checkboxes no longer reruns the whole script, and
+    # everything is committed together when "Generer materiale" is clicked.
+    # Grade, topic and the quick-start templates stay outside (they need
+    # to update the page immediately).
+    with st.form("generation_form", border=False):
+
+        c1, c2, c3, c4, c5, c6 = st.columns(6)
+        with c1:
+            st.session_state.include_theory = st.checkbox("📘 Teori", value=st.session_state.include_theory)
+        with c2:
+            st.session_state.include_examples = st.checkbox("💡 Eksempler", value=st.session_state.include_examples)
+        with c3:
+            st.session_state.include_exercises = st.checkbox("✍️ Oppgaver", value=st.session_state.include_exercises)
+        with c4:
+            st.session_state.include_solutions = st.checkbox("🔑 Fasit", value=st.session_state.include_solutions)
+        with c5:
+            st.session_state.include_graphs = st.checkbox("📊 Grafer", value=st.session_state.include_graphs)
+        with c6:
+            st.session_state.include_tips = st.checkbox("💬 Tips", value=st.session_state.include_tips)
+
+        # Exercise count + difficulty. Always shown: inside the form the
+        # "Oppgaver" checkbox only takes effect on submit, so hiding these
+        # behind it would make them unreachable. Ignored when exercises are off.
         col_count, col_diff = st.columns(2)
         with col_count:
             st.session_state.num_exercises = st.slider(
                 "Antall oppgaver", min_value=3, max_value=25,
-                value=st.session_state.num_exercises, step=1
+                value=st.session_state.num_exercises, step=1,
+                help="Gjelder når ✍️ Oppgaver er valgt"
             )
         with col_diff:
-            difficulty_labels = list(DIFFICULTY_OPTIONS.keys())
-            current_label = DIFFICULTY_REVERSE.get(st.session_state.difficulty_level, "🟡 Middels")
-            diff_idx = difficulty_labels.index(current_label) if current_label in difficulty_labels else 1
+            diff_idx = DIFFICULTY_INDEX.get(st.session_state.difficulty_level, 1)
             selected_difficulty = st.radio(
                 "Vanskelighetsgrad",
-                options=difficulty_labels,
+                options=DIFFICULTY_LABELS,
                 index=diff_idx,
-                horizontal=True
+                horizontal=True,
+                help="Gjelder når ✍️ Oppgaver er valgt"
             )
             st.session_state.difficulty_level = DIFFICULTY_OPTIONS[selected_difficulty]
 
-    # ------------------------------------------------------------------
-    # STEP 4: Advanced options (collapsed by default)
-    # ------------------------------------------------------------------
-    with st.expander("⚙️ Flere innstillinger", expanded=False):
-        adv_col1, adv_col2 = st.columns(2)
-
-        with adv_col1:
-            # Differentiation
-            st.session_state.differentiation_mode = st.checkbox(
-                "📊 Generer 3 nivåer (differensiering)",
-                value=st.session_state.differentiation_mode
-            )
+        # ------------------------------------------------------------------
+        # STEP 4: Advanced options (collapsed by default)
+        # ------------------------------------------------------------------
+        with st.expander("⚙️ Flere innstillinger", expanded=False):
+            adv_col1, adv_col2 = st.columns(2)
+
+            with adv_col1:
+                # Differentiation
+                st.session_state.differentiation_mode = st.checkbox(
+                    "📊 Generer 3 nivåer (differensiering)",
+                    value=st.session_state.differentiation_mode
+                )
 
-            # Language level
-            lang_options = {"Standard norsk": "standard", "Forenklet (B2)": "b2", "Enklere (B1)": "b1"}
-            current_lang = st.session_state.get("language_level", "standard")
-            lang_idx = list(lang_options.values()).index(current_lang) if current_lang in lang_options.values() else 0
-            selected_lang = st.selectbox(
-                "Språknivå",
-                options=list(lang_options.keys()),
-                index=lang_idx,
-                help="For elever med norsk som andrespråk"
-            )
-            st.session_state.language_level = lang_options[selected_lang]
+                # Language level
+                selected_lang = st.selectbox(
+                    "Språknivå",
+                    options=LANGUAGE_LABELS,
+                    index=LANGUAGE_INDEX.get(st.session_state.get("language_level", "standard"), 0),
+                    help="For elever med norsk som andrespråk"
+                )
+                set_state_if_changed("language_level", LANGUAGE_OPTIONS[selected_lang])
+
+                # Fast mode: the writer plans and writes in one call
+                st.session_state.fast_mode = st.checkbox(
+                    "⚡ Hurtigmodus",
+                    value=st.session_state.fast_mode,
+                    help="Forfatteren planlegger og skriver i én omgang. Slå av for en egen planlegging ved pedagogen (tar lengre tid)."
+                )
 
-        with adv_col2:
-            # Exercise types
-            if st.session_state.include_exercises:
-                from src.cache import get_all_exercise_types
+            with adv_col2:
+                # Exercise types (always shown, see the count/difficulty row)
+                st.caption("Oppgavetyper (når ✍️ Oppgaver er valgt)")
                 exercise_types = get_all_exercise_types()
-                selected_types = []
+                current_types = st.session_state.selected_exercise_types
+                selected_types = set()
                 for type_key, type_info in exercise_types.items():
                     if st.checkbox(
                         type_info["name"],
-                        value=type_key in st.session_state.selected_exercise_types,
+                        value=type_key in current_types,
                         key=f"extype_{type_key}"
                     ):
-                        selected_types.append(type_key)
-                st.session_state.selected_exercise_types = selected_types if selected_types else ["standard"]
-
-        # Competency goals
-        from src.cache import get_curriculum_goals
-        competency_goals = get_curriculum_goals(selected_grade)
-        if competency_goals:
-            st.markdown("**🎯 Kompetansemål (LK20)**")
-            selected_goals = []
-            for i, goal in enumerate(competency_goals):
-                display = goal[:80] + "..." if len(goal) > 80 else goal
-                if st.checkbox(display, key=f"goal_{i}", help=goal):
-                    selected_goals.append(goal)
-            st.session_state.selected_competency_goals = selected_goals
+                        selected_types.add(type_key)
+                set_state_if_changed("selected_exercise_types", selected_types or {"standard"})
+
+            # Competency goals
+            competency_goals = goal_choices_for_grade(selected_grade)
+            if competency_goals:
+                st.markdown("**🎯 Kompetansemål (LK20)**")
+                selected_goals = []
+                for i, (goal, display) in enumerate(competency_goals):
+                    if st.checkbox(display, key=f"goal_{i}", help=goal):
+                        selected_goals.append(goal)
+                set_state_if_changed("selected_competency_goals", selected_goals)
+
+        # ------------------------------------------------------------------
+        # GENERATE BUTTON
+        # ------------------------------------------------------------------
+        st.markdown("---")
 
-    # ------------------------------------------------------------------
-    # GENERATE BUTTON
-    # ------------------------------------------------------------------
-    st.markdown("---")
+        can_generate = api_configured and bool(topic) and deps is not None
 
-    can_generate = api_configured and bool(topic)
-
-    if not topic:
-        st.info("Velg eller skriv inn et tema for å starte.")
-
-    # C1: Show time estimate before generation
-    if can_generate:
-        from src.curriculum import estimate_generation_time
-        _est_material = "arbeidsark"
-        if st.session_state.selected_template and st.session_state.selected_template in TEMPLATES:
-            _est_material = TEMPLATES[st.session_state.selected_template]["config"].get("material_type", "arbeidsark")
-        est_min, est_max = estimate_generation_time(
-            material_type=_est_material,
-            num_exercises=st.session_state.num_exercises,
-            include_theory=st.session_state.include_theory,
-            include_examples=st.session_state.include_examples,
-            include_graphs=st.session_state.include_graphs,
+        if not topic:
+            st.info("Velg eller skriv inn et tema for å starte.")
+
+        # Material type from the selected template (one keyed lookup, shared
+        # by the time estimate and the generation block below)
+        tmpl_key = st.session_state.selected_template
+        selected_material = (
+            TEMPLATES[tmpl_key]["config"].get("material_type", "arbeidsark")
+            if tmpl_key in TEMPLATES else "arbeidsark"
+        )
+
+        # C1: Show time estimate before generation
+        if can_generate:
+            est_min, est_max = estimate_generation_time(
+                material_type=selected_material,
+                num_exercises=st.session_state.num_exercises,
+                include_theory=st.session_state.include_theory,
+                include_examples=st.session_state.include_examples,
+                include_graphs=st.session_state.include_graphs,
+            )
+            st.caption(f"Estimert tid: {est_min}–{est_max} min")
+
+        new_variant = st.checkbox(
+            "🎲 Ny variant",
+            value=False,
+            help="Lag et nytt dokument selv om de samme innstillingene ble brukt nylig"
+        )
+
+        # B3: Removed non-functional cancel button (run_crew is blocking)
+        generate_clicked = st.form_submit_button(
+            "◇ Generer materiale",
+            disabled=not can_generate,
+            use_container_width=True,
+            type="primary"
         )
-        st.caption(f"Estimert tid: {est_min}–{est_max} min")
-
-    # B3: Removed non-functional cancel button (run_crew is blocking)
-    generate_clicked = st.button(
-        "◇ Generer materiale",
-        disabled=not can_generate,
-        use_container_width=True,
-        type="primary"
-    )
 
     # ------------------------------------------------------------------
     # GENERATION LOGIC
@@ -480,29 +1110,31 @@ def main():
         st.session_state.latex_result = None
         st.session_state.pdf_path = None
         st.session_state.pdf_bytes = None
+        st.session_state.pdf_b64 = None
         st.session_state.generation_complete = False
         st.session_state.generation_cancelled = False
         st.session_state._generating = True
         st.session_state.word_bytes = None  # C3: Reset Word cache on new generation
+        st.session_state.print_pdf_bytes = None
 
-        filename = make_safe_filename(topic, selected_grade)
+        # One timestamp per generation, reused by every filename derived from it
+        st.session_state._last_ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = make_safe_filename(topic, selected_grade, st.session_state._last_ts)
         st.session_state._last_filename = filename  # C4: Store for download buttons
 
         # Build content options
-        from src.cache import get_all_exercise_types
         exercise_types = get_all_exercise_types()
+        # Selection is a set; walk the catalogue to keep a stable order.
+        # The type checkboxes are always shown, so ignore them without exercises
+        current_types = st.session_state.selected_exercise_types
+        selected_type_keys = (
+            [et for et in exercise_types if et in current_types]
+            if st.session_state.include_exercises else []
+        )
         exercise_type_instructions = [
-            exercise_types[et]["instruction"]
-            for et in st.session_state.selected_exercise_types
-            if et in exercise_types
+            exercise_types[et]["instruction"] for et in selected_type_keys
         ]
 
-        # Get material type from selected template (fix: no unnecessary loop)
-        if st.session_state.selected_template and st.session_state.selected_template in TEMPLATES:
-            selected_material = TEMPLATES[st.session_state.selected_template]["config"].get("material_type", "arbeidsark")
-        else:
-            selected_material = "arbeidsark"
-
         content_options = {
             "include_theory": st.session_state.include_theory,
             "include_examples": st.session_state.include_examples,
@@ -514,23 +1146,19 @@ def main():
             "difficulty": st.session_state.difficulty_level,
             "material_type": selected_material,
             "competency_goals": st.session_state.selected_competency_goals,
-            "exercise_types": st.session_state.selected_exercise_types,
+            "exercise_types": selected_type_keys,
             "exercise_type_instructions": exercise_type_instructions,
             "differentiation_mode": st.session_state.differentiation_mode,
             "language_level": st.session_state.language_level,
+            "fast_mode": st.session_state.fast_mode,
         }
 
         # Build instructions
-        content_instructions = []
-        if not st.session_state.include_theory:
-            content_instructions.append("IKKE inkluder teori eller definisjoner")
-        if not st.session_state.include_examples:
-            content_instructions.append("IKKE inkluder eksempler")
-        if st.session_state.include_exercises:
-            content_instructions.append(f"Lag {st.session_state.num_exercises} oppgaver")
-        if st.session_state.differentiation_mode:
-            content_instructions.append("Lag tre nivåer: lett, middels, vanskelig")
-        instructions = ". ".join(content_instructions)
+        instructions = ". ".join(
+            text.format(num_exercises=st.session_state.num_exercises)
+            for key, when, text in CONTENT_INSTRUCTION_RULES
+            if bool(st.session_state[key]) is when
+        )
 
         # C2: Better progress with status message
         progress_bar = st.progress(0, text="Starter generering...")
@@ -538,62 +1166,64 @@ def main():
 
         try:
             progress_bar.progress(10, text="🎓 AI-teamet jobber...")
-            status_msg.info("⏳ Pedagogen planlegger, matematikeren skriver, og redaktøren kvalitetssikrer. Dette tar vanligvis 1–3 minutter.")
+            if st.session_state.fast_mode:
+                status_msg.info("⏳ Matematikeren planlegger og skriver, og redaktøren kvalitetssikrer. Dette tar vanligvis 1–3 minutter.")
+            else:
+                status_msg.info("⏳ Pedagogen planlegger, matematikeren skriver, og redaktøren kvalitetssikrer. Dette tar vanligvis 1–3 minutter.")
+
+            # The agents' stages depend on each other, but the one-off
+            # preamble format dump doesn't: build it while they write
+            _BACKGROUND.submit(deps.warm_preamble_format)
+
+            def on_task_done(done: int, total: int) -> None:
+                # Real stage completions drive the bar from 10% to 80%
+                progress_bar.progress(
+                    10 + 70 * done // total,
+                    text=f"🎓 AI-teamet jobber... ({done}/{total} steg ferdig)"
+                )
 
-            raw_result = run_crew(
-                grade=grade_options[selected_grade],
+            latex_result = generate_latex_document(
+                grade=GRADE_OPTIONS[selected_grade],
                 topic=topic,
                 material_type=selected_material,
                 instructions=instructions,
-                content_options=content_options
+                content_options=content_options,
+                on_task_done=on_task_done,
+                session_id=st.session_state._session_id,
+                new_variant=new_variant,
             )
+            st.session_state.latex_result = latex_result
 
             status_msg.empty()
-            progress_bar.progress(70, text="🔧 Bygger komplett LaTeX-dokument...")
-
-            # Always produce a complete, self-contained .tex file
-            # by cleaning AI output and wrapping with standard preamble.
-            # This ensures the .tex file compiles in Overleaf/pdflatex.
-            from src.tools import ensure_preamble
-            from src.tools.pdf_generator import clean_ai_output
-            latex_result = ensure_preamble(clean_ai_output(raw_result))
-            st.session_state.latex_result = latex_result
 
             progress_bar.progress(80, text="📄 Lagrer filer...")
 
-            tex_path = save_tex_file(latex_result, filename)
+            # save_tex_file/generate_pdf stay on this thread: both write
+            # output/<filename>.tex and generate_pdf reports errors via st.error
+            save_tex_file(latex_result, filename)
             # Pass already-processed content to PDF generator
-            pdf_path = generate_pdf(latex_result, filename)
-            if pdf_path:
+            pdf = generate_pdf(latex_result, filename)
+            pdf_path = None
+            if pdf:
+                pdf_path, st.session_state.pdf_bytes = pdf
                 st.session_state.pdf_path = pdf_path
-                with open(pdf_path, "rb") as f:
-                    st.session_state.pdf_bytes = f.read()
+                st.session_state.pdf_b64 = None
 
             progress_bar.progress(100, text="✅ Ferdig!")
 
-            # Record history and invalidate cache so it shows immediately
-            try:
-                from src.storage import add_to_history as save_to_storage
-                from src.cache import invalidate_history_cache
-                save_to_storage(
-                    topic=topic, grade=selected_grade,
-                    material_type=selected_material,
-                    tex_content=latex_result, pdf_path=pdf_path
-                )
-                invalidate_history_cache()
-            except Exception as e:
-                logger.warning(f"Kunne ikke lagre til historikk: {e}")
-
-            # Record usage
-            try:
-                from src.tools import record_generation
-                record_generation(
-                    topic=topic, grade=selected_grade,
-                    material_type=selected_material,
-                    num_exercises=st.session_state.num_exercises
-                )
-            except Exception as e:
-                logger.warning(f"Kunne ikke registrere bruk: {e}")
+            # History is written before the rerun, so the new entry shows
+            # immediately; only the usage stats go to the background
+            _record_generation(
+                topic=topic, grade=selected_grade,
+                material_type=selected_material,
+                tex_content=latex_result, pdf_path=pdf_path,
+            )
+            _BACKGROUND.submit(
+                _record_usage,
+                topic=topic, grade=selected_grade,
+                material_type=selected_material,
+                num_exercises=st.session_state.num_exercises,
+            )
 
             st.session_state.generation_complete = True
             st.session_state._generating = False
@@ -624,272 +1254,21 @@ def main():
     # RESULTS
     # ------------------------------------------------------------------
     if st.session_state.generation_complete and st.session_state.latex_result:
-        st.markdown("---")
-        st.success("Materiale generert!")
-
-        # C4: Use descriptive filenames
-        dl_basename = st.session_state.get("_last_filename", f"matematikk_{datetime.now().strftime('%Y%m%d')}")
-
-        # Download row
-        dl_col1, dl_col2, dl_col3 = st.columns(3)
-
-        with dl_col1:
-            st.download_button(
-                "📄 Last ned LaTeX",
-                data=st.session_state.latex_result,
-                file_name=f"{dl_basename}.tex",
-                mime="text/plain",
-                use_container_width=True
-            )
-
-        with dl_col2:
-            if st.session_state.pdf_bytes:
-                st.download_button(
-                    "📕 Last ned PDF",
-                    data=st.session_state.pdf_bytes,
-                    file_name=f"{dl_basename}.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
-            else:
-                st.button("📕 PDF", disabled=True, use_container_width=True, help="Krever pdflatex")
-
-        with dl_col3:
-            # C3: Persist Word export in session state
-            if st.session_state.get("word_bytes"):
-                st.download_button(
-                    "📘 Last ned Word",
-                    data=st.session_state.word_bytes,
-                    file_name=f"{dl_basename}.docx",
-                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                    use_container_width=True,
-                )
-            else:
-                try:
-                    from src.tools import is_word_export_available, latex_to_word
-                    if is_word_export_available():
-                        if st.button("📘 Word (.docx)", use_container_width=True):
-                            with st.spinner("Konverterer til Word..."):
-                                output_path = Path("output") / f"{dl_basename}.docx"
-                                output_path.parent.mkdir(exist_ok=True)
-                                word_path = latex_to_word(st.session_state.latex_result, str(output_path))
-                                if word_path and Path(word_path).exists():
-                                    with open(word_path, "rb") as f:
-                                        st.session_state.word_bytes = f.read()
-                                    st.rerun()
-                                else:
-                                    st.warning("Word-konvertering feilet.")
-                    else:
-                        st.button("📘 Word", disabled=True, use_container_width=True)
-                except ImportError:
-                    st.button("📘 Word", disabled=True, use_container_width=True)
-
-        # C5: Better PDF preview with controls and fallback
-        if st.session_state.pdf_bytes:
-            pdf_b64 = base64.b64encode(st.session_state.pdf_bytes).decode('utf-8')
-            st.markdown(f'''
-            <div style="position: relative; margin-top: 1rem;">
-                <div style="display: flex; justify-content: flex-end; gap: 0.5rem; margin-bottom: 0.5rem;">
-                    <a href="data:application/pdf;base64,{pdf_b64}" target="_blank"
-                       style="color: #94a3b8; font-size: 0.8rem; text-decoration: none;">
-                       Åpne i ny fane ↗
-                    </a>
-                </div>
-                <iframe
-                    src="data:application/pdf;base64,{pdf_b64}#toolbar=1&navpanes=0"
-                    width="100%" height="700"
-                    style="border: 1px solid #334155; border-radius: 12px;"
-                ></iframe>
-                <noscript>
-                    <p style="color: #94a3b8; text-align: center; padding: 2rem;">
-                        PDF-forhåndsvisning krever JavaScript. Last ned filen i stedet.
-                    </p>
-                </noscript>
-            </div>
-            ''', unsafe_allow_html=True)
-
-        # LaTeX code viewer
-        with st.expander("👁️ Se LaTeX-kode"):
-            st.code(st.session_state.latex_result, language="latex")
-
-        # Re-compile after edit
-        with st.expander("✏️ Rediger og kompiler på nytt"):
-            edited = st.text_area(
-                "LaTeX", value=st.session_state.latex_result,
-                height=300, label_visibility="collapsed"
-            )
-            if st.button("🔄 Kompiler på nytt", use_container_width=True):
-                st.session_state.latex_result = edited
-                with st.spinner("Kompilerer..."):
-                    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    pdf_path = generate_pdf(edited, f"redigert_{ts}")
-                    if pdf_path:
-                        st.session_state.pdf_path = pdf_path
-                        with open(pdf_path, "rb") as f:
-                            st.session_state.pdf_bytes = f.read()
-                        st.rerun()
-
-        # ==============================================================
-        # C9: Surface useful tools that were built but not in the UI
-        # ==============================================================
-
-        # --- Difficulty analysis ---
-        with st.expander("📊 Vanskelighetsanalyse"):
-            try:
-                from src.tools import analyze_content
-                analysis = analyze_content(st.session_state.latex_result)
-                if analysis.total_exercises > 0:
-                    ac1, ac2, ac3, ac4 = st.columns(4)
-                    ac1.metric("🟢 Lett", analysis.easy_count)
-                    ac2.metric("🟡 Middels", analysis.medium_count)
-                    ac3.metric("🔴 Vanskelig", analysis.hard_count)
-                    ac4.metric("⏱️ Est. tid", f"{analysis.estimated_time_minutes} min")
-                    if analysis.recommendations:
-                        for rec in analysis.recommendations:
-                            st.caption(f"💡 {rec}")
-                else:
-                    st.caption("Ingen oppgaver funnet å analysere.")
-            except Exception:
-                st.caption("Analyse ikke tilgjengelig.")
-
-        # --- Print-friendly version ---
-        with st.expander("🖨️ Utskriftsvennlig versjon"):
-            st.caption("Genererer en versjon med gråtoner, optimalisert for utskrift.")
-            if st.button("Lag utskriftsversjon", use_container_width=True, key="btn_print"):
-                try:
-                    from src.tools import create_print_version
-                    with st.spinner("Lager utskriftsversjon..."):
-                        print_latex = create_print_version(st.session_state.latex_result)
-                        print_pdf = generate_pdf(print_latex, f"print_{datetime.now().strftime('%H%M%S')}")
-                        if print_pdf and Path(print_pdf).exists():
-                            with open(print_pdf, "rb") as f:
-                                st.download_button(
-                                    "⬇️ Last ned utskriftsversjon",
-                                    data=f.read(),
-                                    file_name=f"{dl_basename}_utskrift.pdf",
-                                    mime="application/pdf",
-                                    use_container_width=True,
-                                )
-                        else:
-                            st.warning("Kunne ikke generere utskriftsversjon.")
-                except Exception as e:
-                    st.warning(f"Feil: {e}")
-
-        # --- Exercise bank ---
-        with st.expander("🏦 Lagre til oppgavebank"):
-            st.caption("Ekstraher enkeltoppgaver og lagre dem for gjenbruk.")
-            if st.button("🔍 Finn og lagre oppgaver", use_container_width=True, key="btn_exbank"):
-                try:
-                    from src.tools import extract_exercises_from_latex, add_exercise
-                    extracted = extract_exercises_from_latex(st.session_state.latex_result)
-                    if extracted:
-                        count = 0
-                        for ex in extracted:
-                            try:
-                                add_exercise(
-                                    title=ex.get("title", "Oppgave"),
-                                    topic=st.session_state.get("_last_topic", "Matematikk") or "Matematikk",
-                                    grade_level=st.session_state.get("_last_grade", "8. trinn") or "8. trinn",
-                                    latex_content=ex.get("full_latex", ex.get("content", "")),
-                                    difficulty=ex.get("difficulty", "middels"),
-                                    solution=ex.get("solution"),
-                                    source="generated",
-                                )
-                                count += 1
-                            except Exception:
-                                pass
-                        from src.cache import invalidate_exercises_cache
-                        invalidate_exercises_cache()
-                        st.success(f"Lagret {count} oppgaver til oppgavebanken!")
-                    else:
-                        st.info("Fant ingen oppgaver å ekstrahere.")
-                except Exception as e:
-                    st.warning(f"Feil: {e}")
-
-        # --- Rubric generator ---
-        with st.expander("📋 Vurderingsrubrikk"):
-            st.caption("Generer en vurderingsmatrise basert på innholdet.")
-            if st.button("Lag rubrikk", use_container_width=True, key="btn_rubric"):
-                try:
-                    from src.tools import generate_rubric, rubric_to_markdown
-                    rubric_topic = st.session_state.get("_last_topic", "Matematikk") or "Matematikk"
-                    rubric_grade = st.session_state.get("_last_grade", "10. trinn") or "10. trinn"
-                    rubric = generate_rubric(
-                        topic=rubric_topic,
-                        grade_level=rubric_grade,
-                        num_exercises=st.session_state.num_exercises,
-                    )
-                    st.markdown(rubric_to_markdown(rubric))
-                except Exception as e:
-                    st.warning(f"Feil: {e}")
-
-        # --- LK20 coverage ---
-        with st.expander("🎯 LK20-dekning"):
-            st.caption("Sjekk hvilke kompetansemål innholdet dekker.")
-            try:
-                from src.tools import analyze_coverage, format_coverage_report
-                coverage_grade = st.session_state.get("_last_grade", "10. trinn") or "10. trinn"
-                coverage = analyze_coverage(st.session_state.latex_result, coverage_grade)
-                report = format_coverage_report(coverage)
-                st.markdown(report)
-            except Exception as e:
-                st.caption("LK20-analyse ikke tilgjengelig.")
+        render_results()
 
     # ------------------------------------------------------------------
     # HISTORY (show recent generations)
     # ------------------------------------------------------------------
-    try:
-        from src.cache import get_history
-        history = get_history()
-        if history:
-            with st.expander(f"📚 Tidligere genereringer ({len(history)})", expanded=False):
-                for entry in history[:10]:
-                    entry_topic = entry.get("topic", "Ukjent")
-                    entry_grade = entry.get("grade", "")
-                    entry_type = entry.get("material_type", "")
-                    entry_date = entry.get("created_at", entry.get("timestamp", ""))
-                    if isinstance(entry_date, str) and len(entry_date) > 10:
-                        entry_date = entry_date[:10]
-
-                    col_info, col_action = st.columns([3, 1])
-                    with col_info:
-                        st.markdown(
-                            f"**{entry_topic}** — {entry_grade} · {entry_type}  \n"
-                            f"<small style='color:#64748b'>{entry_date}</small>",
-                            unsafe_allow_html=True
-                        )
-                    with col_action:
-                        entry_id = entry.get("id", "")
-                        if entry_id:
-                            from src.storage import get_tex_content
-                            tex_content = get_tex_content(entry_id)
-                            if tex_content:
-                                # Ensure historical .tex files also have preamble
-                                if r'\documentclass' not in tex_content:
-                                    from src.tools import ensure_preamble
-                                    from src.tools.pdf_generator import clean_ai_output
-                                    tex_content = ensure_preamble(clean_ai_output(tex_content))
-                                st.download_button(
-                                    "⬇️ .tex",
-                                    data=tex_content,
-                                    file_name=f"{entry_topic[:20]}.tex",
-                                    mime="text/plain",
-                                    key=f"hist_{entry_id}",
-                                    use_container_width=True,
-                                )
-                    st.markdown("<hr style='margin:0.3rem 0;border-color:#1e293b'>", unsafe_allow_html=True)
-    except Exception:
-        pass  # History display is non-critical
+    render_history()
 
     # ------------------------------------------------------------------
     # FOOTER
     # ------------------------------------------------------------------
-    st.markdown("""
-    <div style="text-align: center; color: #64748b; font-size: 0.75rem; margin-top: 3rem; padding: 1rem 0;">
-        MateMaTeX &copy; 2026 &bull; <a href="https://www.crewai.com/" target="_blank" style="color: #f59e0b; text-decoration: none;">CrewAI</a>
-        + <a href="https://streamlit.io/" target="_blank" style="color: #f59e0b; text-decoration: none;">Streamlit</a>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(FOOTER_HTML, unsafe_allow_html=True)
+
+    if os.getenv("MATEMATEX_DEBUG"):
+        with st.sidebar.expander("Cache stats"):
+            st.json(get_cache_stats())
 
 
 if __name__ == "__main__":
@@ -3,98 +3,198 @@ Caching utilities for MateMaTeX.
 Provides cached versions of frequently-used load functions to improve performance.
 """
 
+import functools
+from collections.abc import Mapping
+
 import streamlit as st
-from typing import Optional
 
+from src.curriculum import (
+    get_all_topics_flat,
+    get_competency_goals,
+    get_exercise_types,
+    get_topics_for_grade,
+)
+from src.storage import get_tex_contents, load_history, load_settings
+
+# src.tools is imported inside the getters that need it: it is the heavy
+# package, and a failure there must only disable those getters, not the app
+
+
+# Pure lookups into module constants use functools.cache instead of
+# Streamlit's caches, which hash arguments and results on every call.
+#
+# User data (history, favorites, exercises, folders, tags, templates) has no
+# TTL: every write goes through this app, so call the matching
+# invalidate_*_cache() after modifying it. It is held in st.cache_resource as
+# tuples, shared by reference across reruns and sessions; change it through
+# the storage functions, never in place.
 
 # TTL for different cache types (in seconds)
-TTL_SHORT = 30      # 30 seconds for frequently changing data
 TTL_MEDIUM = 300    # 5 minutes for semi-static data  
 TTL_LONG = 3600     # 1 hour for rarely changing data
 
 
-@st.cache_data(ttl=TTL_SHORT, show_spinner=False)
-def get_history() -> list[dict]:
-    """Cached version of load_history."""
-    from src.storage import load_history
-    return load_history()
+# Per-function call/miss counters, see get_cache_stats()
+_STATS: dict[str, dict[str, int]] = {}
+
+
+def _tracked(cache):
+    """
+    Apply a cache decorator and count calls and actual computations.
+    
+    The inner function only runs on a cache miss, so misses are exact;
+    every other call was served from the cache.
+    """
+    def decorate(func):
+        stats = _STATS.setdefault(func.__name__, {"calls": 0, "misses": 0})
+
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            stats["misses"] += 1
+            return func(*args, **kwargs)
+
+        cached = cache(compute)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stats["calls"] += 1
+            return cached(*args, **kwargs)
+
+        # Keep the cache's own controls (st: clear, functools: cache_clear)
+        for attr in ("clear", "cache_clear", "cache_info"):
+            if hasattr(cached, attr):
+                setattr(wrapper, attr, getattr(cached, attr))
+        return wrapper
+    return decorate
+
+
+def get_cache_stats() -> dict[str, dict[str, int]]:
+    """Calls, hits and misses per cached function since the process started."""
+    return {
+        name: {"calls": s["calls"], "hits": s["calls"] - s["misses"], "misses": s["misses"]}
+        for name, s in _STATS.items()
+    }
+
+
+@_tracked(st.cache_resource(show_spinner=False))
+def get_history() -> tuple:
+    """Cached version of load_history (shared, read-only tuple)."""
+    return tuple(load_history())
+
+
+@_tracked(st.cache_data(ttl=TTL_LONG, max_entries=8, show_spinner=False))
+def get_history_texes(entry_ids: tuple[str, ...]) -> dict[str, str | None]:
+    """Cached, self-contained LaTeX for several history entries (entries never change)."""
+    from src.tools import clean_ai_output, ensure_preamble
+    tex_contents = get_tex_contents(list(entry_ids))
+    for entry_id, tex_content in tex_contents.items():
+        # Older history files were saved without the preamble
+        if tex_content and r'\documentclass' not in tex_content:
+            tex_contents[entry_id] = ensure_preamble(clean_ai_output(tex_content))
+    return tex_contents
 
 
-@st.cache_data(ttl=TTL_MEDIUM, show_spinner=False)
+@_tracked(st.cache_data(ttl=TTL_MEDIUM, show_spinner=False))
 def get_settings() -> dict:
     """Cached version of load_settings."""
-    from src.storage import load_settings
     return load_settings()
 
 
-@st.cache_data(ttl=TTL_SHORT, show_spinner=False)
-def get_favorites() -> list:
-    """Cached version of load_favorites."""
+@_tracked(st.cache_resource(show_spinner=False))
+def get_favorites() -> tuple:
+    """Cached version of load_favorites (shared, read-only tuple)."""
     from src.tools import load_favorites
-    return load_favorites()
+    return tuple(load_favorites())
 
 
-@st.cache_data(ttl=TTL_SHORT, show_spinner=False)
-def get_exercises() -> list:
-    """Cached version of load_exercises."""
+@_tracked(st.cache_resource(show_spinner=False))
+def get_exercises() -> tuple:
+    """Cached version of load_exercises (shared, read-only tuple)."""
     from src.tools import load_exercises
-    return load_exercises()
+    return tuple(load_exercises())
 
 
-@st.cache_data(ttl=TTL_SHORT, show_spinner=False)
-def get_folders() -> list:
-    """Cached version of load_folders."""
+@_tracked(st.cache_resource(show_spinner=False))
+def get_folders() -> tuple:
+    """Cached version of load_folders (shared, read-only tuple)."""
     from src.tools import load_folders
-    return load_folders()
+    return tuple(load_folders())
 
 
-@st.cache_data(ttl=TTL_SHORT, show_spinner=False)
-def get_tags() -> list:
-    """Cached version of load_tags."""
+@_tracked(st.cache_resource(show_spinner=False))
+def get_tags() -> tuple:
+    """Cached version of load_tags (shared, read-only tuple)."""
     from src.tools import load_tags
-    return load_tags()
+    return tuple(load_tags())
 
 
-@st.cache_data(ttl=TTL_SHORT, show_spinner=False)
-def get_custom_templates() -> list:
-    """Cached version of load_custom_templates."""
+@_tracked(st.cache_resource(show_spinner=False))
+def get_custom_templates() -> tuple:
+    """Cached version of load_custom_templates (shared, read-only tuple)."""
     from src.tools import load_custom_templates
-    return load_custom_templates()
+    return tuple(load_custom_templates())
 
 
-@st.cache_data(ttl=TTL_LONG, show_spinner=False)
-def get_curriculum_topics(grade: str) -> dict:
-    """Cached version of get_topics_for_grade."""
-    from src.curriculum import get_topics_for_grade
+# The curriculum getters resolve grade aliases through a memoized resolver
+# and return frozen, precomputed data, so every spelling of a grade shares
+# one object; a Streamlit cache keyed on the raw string would only add
+# one entry per alias.
+def get_curriculum_topics(grade: str) -> Mapping[str, tuple[str, ...]]:
+    """Topics by category for a grade (shared, read-only mapping)."""
     return get_topics_for_grade(grade)
 
 
-@st.cache_data(ttl=TTL_LONG, show_spinner=False)
-def get_curriculum_goals(grade: str) -> list:
-    """Cached version of get_competency_goals."""
-    from src.curriculum import get_competency_goals
+def get_curriculum_topics_flat(grade: str) -> tuple[str, ...]:
+    """All topics for a grade (shared tuple)."""
+    return get_all_topics_flat(grade)
+
+
+def get_curriculum_goals(grade: str) -> tuple[str, ...]:
+    """Competency goals for a grade (shared tuple)."""
     return get_competency_goals(grade)
 
 
-@st.cache_data(ttl=TTL_LONG, show_spinner=False)
-def get_all_exercise_types() -> dict:
-    """Cached version of get_exercise_types."""
-    from src.curriculum import get_exercise_types
+@_tracked(st.cache_data(ttl=TTL_MEDIUM, max_entries=128, show_spinner=False))
+def get_topic_suggestions_cached(grade: str, current_topic: str = "", num_suggestions: int = 4) -> list:
+    """Cached version of get_topic_suggestions."""
+    from src.tools import get_topic_suggestions
+    return get_topic_suggestions(
+        grade=grade, current_topic=current_topic, num_suggestions=num_suggestions
+    )
+
+
+@_tracked(functools.cache)
+def get_all_exercise_types() -> Mapping[str, Mapping[str, str]]:
+    """Cached version of get_exercise_types (shared, read-only mapping)."""
     return get_exercise_types()
 
 
-@st.cache_data(ttl=TTL_LONG, show_spinner=False)
-def get_formula_categories() -> list:
-    """Cached version of get_categories."""
+@_tracked(functools.cache)
+def get_formula_categories() -> tuple:
+    """Cached version of get_categories (shared, read-only tuple)."""
     from src.tools import get_categories
-    return get_categories()
+    return tuple(get_categories())
 
 
-@st.cache_data(ttl=TTL_LONG, show_spinner=False)
-def get_formulas_for_category(category: str) -> list:
-    """Cached version of get_formulas_by_category."""
+@_tracked(functools.cache)
+def get_formulas_for_category(category: str) -> tuple:
+    """Cached version of get_formulas_by_category (shared, read-only tuple)."""
     from src.tools import get_formulas_by_category
-    return get_formulas_by_category(category)
+    return tuple(get_formulas_by_category(category))
+
+
+@_tracked(st.cache_data(max_entries=16, show_spinner=False))
+def get_content_analysis(latex_content: str):
+    """Cached version of analyze_content, keyed on the LaTeX source."""
+    from src.tools import analyze_content
+    return analyze_content(latex_content)
+
+
+@_tracked(st.cache_data(max_entries=16, show_spinner=False))
+def get_coverage_report(latex_content: str, grade: str) -> str:
+    """Cached, formatted version of analyze_coverage."""
+    from src.tools import analyze_coverage, format_coverage_report
+    return format_coverage_report(analyze_coverage(latex_content, grade))
 
 
 def invalidate_history_cache():
@@ -127,12 +227,18 @@ def invalidate_templates_cache():
     get_custom_templates.clear()
 
 
+_ALL_CLEARS = (
+    get_history.clear,
+    get_settings.clear,
+    get_favorites.clear,
+    get_exercises.clear,
+    get_folders.clear,
+    get_tags.clear,
+    get_custom_templates.clear,
+)
+
+
 def invalidate_all_caches():
     """Clear all caches."""
-    get_history.clear()
-    get_settings.clear()
-    get_favorites.clear()
-    get_exercises.clear()
-    get_folders.clear()
-    get_tags.clear()
-    get_custom_templates.clear()
+    for clear in _ALL_CLEARS:
+        clear()
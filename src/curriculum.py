@@ -4,10 +4,14 @@ Basert på Kunnskapsløftet 2020 (LK20).
 Utvidet med flere emner og kompetansemål.
 """
 
+from collections.abc import Mapping
+from functools import lru_cache
+from types import MappingProxyType
+
 # Emnebibliotek organisert etter klassetrinn
 TOPIC_LIBRARY = {
     "1.-4. trinn": {
-        "Tall og tallforståelse": [
+        "Tall og tallforståelse": (
             "Tallene 0-100",
             "Tallene 0-1000",
             "Tallene 0-10 000",
@@ -17,8 +21,8 @@ TOPIC_LIBRARY = {
             "Tallinja",
             "Sammenligne og ordne tall",
             "Avrunding av tall",
-        ],
-        "Regning": [
+        ),
+        "Regning": (
             "Addisjon med tierovergang",
             "Subtraksjon med tierovergang",
             "Multiplikasjon (gangetabellen 1-10)",
@@ -28,14 +32,14 @@ TOPIC_LIBRARY = {
             "Regnerekkefølge",
             "Regnestrategier",
             "Likhetstegnet og likninger",
-        ],
-        "Brøk": [
+        ),
+        "Brøk": (
             "Halve og hele",
             "Enkle brøker (1/2, 1/4, 1/3)",
             "Brøk som del av en mengde",
             "Sammenligne enkle brøker",
-        ],
-        "Måling": [
+        ),
+        "Måling": (
             "Lengde (mm, cm, m, km)",
             "Vekt (gram, kg)",
             "Volum (dl, liter)",
@@ -43,24 +47,24 @@ TOPIC_LIBRARY = {
             "Penger og kroner",
             "Temperatur",
             "Omgjøring mellom enheter",
-        ],
-        "Geometri": [
+        ),
+        "Geometri": (
             "Geometriske figurer (trekant, firkant, sirkel)",
             "Tredimensjonale figurer (kube, kule, sylinder)",
             "Symmetri",
             "Mønster og rekkefølge",
             "Speiling",
             "Retninger (høyre, venstre, opp, ned)",
-        ],
-        "Statistikk": [
+        ),
+        "Statistikk": (
             "Telle og sortere",
             "Enkle tabeller",
             "Søylediagram",
             "Piktogram",
-        ],
+        ),
     },
     "5.-7. trinn": {
-        "Tall og algebra": [
+        "Tall og algebra": (
             "Store tall og desimaltall",
             "Negative tall",
             "Primtall og sammensatte tall",
@@ -71,8 +75,8 @@ TOPIC_LIBRARY = {
             "Enkle likninger",
             "Variabler og uttrykk",
             "Tallmønster og figurtall",
-        ],
-        "Brøk, desimaltall og prosent": [
+        ),
+        "Brøk, desimaltall og prosent": (
             "Brøkregning (addisjon og subtraksjon)",
             "Brøkregning (multiplikasjon)",
             "Desimaltall",
@@ -80,14 +84,14 @@ TOPIC_LIBRARY = {
             "Omgjøring mellom brøk, desimal og prosent",
             "Finne prosenten av et tall",
             "Sammenligne brøker med ulik nevner",
-        ],
-        "Forhold og proporsjonalitet": [
+        ),
+        "Forhold og proporsjonalitet": (
             "Forholdstall",
             "Skala og målestokk",
             "Proporsjonale størrelser",
             "Pris per enhet",
-        ],
-        "Geometri": [
+        ),
+        "Geometri": (
             "Vinkler (spisse, rette, stumpe)",
             "Vinkelmåling med gradskive",
             "Areal av trekanter",
@@ -99,8 +103,8 @@ TOPIC_LIBRARY = {
             "Koordinatsystemet",
             "Konstruksjon med passer og linjal",
             "Formlikhet",
-        ],
-        "Statistikk og sannsynlighet": [
+        ),
+        "Statistikk og sannsynlighet": (
             "Gjennomsnitt",
             "Median",
             "Typetall",
@@ -109,10 +113,10 @@ TOPIC_LIBRARY = {
             "Tabeller og frekvens",
             "Enkel sannsynlighet",
             "Kombinatorikk (telle muligheter)",
-        ],
+        ),
     },
     "8. trinn": {
-        "Tall og algebra": [
+        "Tall og algebra": (
             "Regning med potenser",
             "Potensregler",
             "Kvadratrot",
@@ -122,16 +126,16 @@ TOPIC_LIBRARY = {
             "Likninger med én ukjent",
             "Ulikheter",
             "Formler og formelregning",
-        ],
-        "Brøk, desimaltall og prosent": [
+        ),
+        "Brøk, desimaltall og prosent": (
             "Brøkregning alle regnearter",
             "Prosentregning",
             "Promille",
             "Vekstfaktor",
             "Prosentvis økning og reduksjon",
             "Rabatt og påslag",
-        ],
-        "Geometri": [
+        ),
+        "Geometri": (
             "Pytagoras' setning",
             "Pytagoras' setning - anvendelser",
             "Areal og omkrets av sirkler",
@@ -140,24 +144,24 @@ TOPIC_LIBRARY = {
             "Overflate av prismer",
             "Formlikhet og kongruens",
             "Målestokk",
-        ],
-        "Funksjoner": [
+        ),
+        "Funksjoner": (
             "Koordinatsystemet",
             "Lineære sammenhenger",
             "Tabell, graf og formel",
             "Proporsjonale og omvendt proporsjonale størrelser",
             "Praktiske funksjoner",
-        ],
-        "Statistikk og sannsynlighet": [
+        ),
+        "Statistikk og sannsynlighet": (
             "Sentralmål (gjennomsnitt, median, typetall)",
             "Spredningsmål (variasjonsbredde)",
             "Enkel sannsynlighetsregning",
             "Relativ frekvens",
             "Presentasjon av data",
-        ],
+        ),
     },
     "9. trinn": {
-        "Tall og algebra": [
+        "Tall og algebra": (
             "Potenser med negative eksponenter",
             "Standardform (vitenskapelig notasjon)",
             "Faktorisering av algebraiske uttrykk",
@@ -166,8 +170,8 @@ TOPIC_LIBRARY = {
             "Grafisk løsning av likningssett",
             "Innsettingsmetoden",
             "Addisjonsmetoden",
-        ],
-        "Økonomi": [
+        ),
+        "Økonomi": (
             "Renter og lån",
             "Rentesrente",
             "Budsjett og regnskap",
@@ -175,33 +179,33 @@ TOPIC_LIBRARY = {
             "Vekstfaktor og eksponentiell vekst",
             "Nedbetaling av lån",
             "Sparing",
-        ],
-        "Geometri": [
+        ),
+        "Geometri": (
             "Pytagoras anvendelser i praktiske oppgaver",
             "Areal av sammensatte figurer",
             "Setninger om trekanter",
             "Konstruksjon med passer og linjal",
             "Geometriske steder",
             "Innskrevne og omskrevne sirkler",
-        ],
-        "Funksjoner": [
+        ),
+        "Funksjoner": (
             "Lineære funksjoner",
             "Stigningstall og konstantledd",
             "Skjæringspunkt mellom linjer",
             "Praktiske problemer med funksjoner",
             "Tolkning av grafer",
             "Lineær regresjon",
-        ],
-        "Statistikk og sannsynlighet": [
+        ),
+        "Statistikk og sannsynlighet": (
             "Statistisk analyse",
             "Kombinatorikk",
             "Sannsynlighetsberegning",
             "Valgtre",
             "Betinget sannsynlighet",
-        ],
+        ),
     },
     "10. trinn": {
-        "Tall og algebra": [
+        "Tall og algebra": (
             "Rasjonale og irrasjonale tall",
             "Potensregler",
             "Faktorisering av andregradsuttrykk",
@@ -210,8 +214,8 @@ TOPIC_LIBRARY = {
             "Andregradslikninger",
             "Abc-formelen (løsningsformelen)",
             "Formler og formelregning",
-        ],
-        "Funksjoner": [
+        ),
+        "Funksjoner": (
             "Lineære funksjoner - repetisjon",
             "Andregradsfunksjoner (parabler)",
             "Toppunkt og bunnpunkt",
@@ -219,8 +223,8 @@ TOPIC_LIBRARY = {
             "Eksponentialfunksjoner",
             "Praktisk modellering",
             "Regresjon",
-        ],
-        "Geometri": [
+        ),
+        "Geometri": (
             "Trigonometri i rettvinklede trekanter",
             "Sinus, cosinus og tangens",
             "Finne ukjente sider",
@@ -230,23 +234,23 @@ TOPIC_LIBRARY = {
             "Volum av sylinder",
             "Volum av kule",
             "Overflate av sylinder og kule",
-        ],
-        "Sannsynlighet og statistikk": [
+        ),
+        "Sannsynlighet og statistikk": (
             "Sannsynlighetsmodeller",
             "Kombinatorikk",
             "Ordnet og uordnet utvalg",
             "Kritisk vurdering av statistikk",
             "Histogram og boksplott",
-        ],
-        "Eksamensoppgaver": [
+        ),
+        "Eksamensoppgaver": (
             "Del 1 oppgaver (uten hjelpemidler)",
             "Del 2 oppgaver (med hjelpemidler)",
             "Problemløsningsoppgaver",
             "Modelleringsoppgaver",
-        ],
+        ),
     },
     "VG1 1T": {
-        "Algebra": [
+        "Algebra": (
             "Regneregler og parenteser",
             "Potenser og røtter",
             "Rasjonale uttrykk",
@@ -256,8 +260,8 @@ TOPIC_LIBRARY = {
             "Formelregning",
             "Andregradslikninger",
             "Faktorisering av andregradsuttrykk",
-        ],
-        "Funksjoner": [
+        ),
+        "Funksjoner": (
             "Lineære funksjoner",
             "Andregradsfunksjoner",
             "Polynomfunksjoner",
@@ -266,8 +270,8 @@ TOPIC_LIBRARY = {
             "Logaritmer",
             "Logaritmeregler",
             "Eksponentiallikninger",
-        ],
-        "Geometri": [
+        ),
+        "Geometri": (
             "Trigonometri (sinus, cosinus, tangens)",
             "Sinussetningen",
             "Cosinussetningen",
@@ -276,25 +280,25 @@ TOPIC_LIBRARY = {
             "Vektorregning",
             "Skalarprodukt",
             "Analytisk geometri",
-        ],
-        "Sannsynlighet": [
+        ),
+        "Sannsynlighet": (
             "Kombinatorikk",
             "Permutasjoner",
             "Kombinasjoner",
             "Sannsynlighetsberegning",
             "Ordnet og uordnet utvalg",
             "Med og uten tilbakelegging",
-        ],
+        ),
     },
     "VG1 1P": {
-        "Tall og algebra": [
+        "Tall og algebra": (
             "Prosentregning",
             "Vekstfaktor",
             "Praktisk bruk av formler",
             "Likninger",
             "Formelregning",
-        ],
-        "Økonomi": [
+        ),
+        "Økonomi": (
             "Budsjett og regnskap",
             "Lån og sparing",
             "Renter og avdrag",
@@ -302,67 +306,67 @@ TOPIC_LIBRARY = {
             "Skatteberegning",
             "Personlig økonomi",
             "Valuta",
-        ],
-        "Funksjoner": [
+        ),
+        "Funksjoner": (
             "Lineære modeller",
             "Praktiske funksjoner",
             "Grafisk framstilling",
             "Tolkning av grafer",
             "Regresjon med digitale verktøy",
-        ],
-        "Geometri": [
+        ),
+        "Geometri": (
             "Måling og beregning",
             "Praktisk trigonometri",
             "Areal og volum",
             "Målestokk",
-        ],
-        "Statistikk": [
+        ),
+        "Statistikk": (
             "Dataanalyse",
             "Sentralmål og spredningsmål",
             "Kritisk vurdering",
             "Presentasjon av data",
             "Utvalg og populasjon",
-        ],
+        ),
     },
     "VG2 2P": {
-        "Tall og algebra": [
+        "Tall og algebra": (
             "Prosentregning i ulike sammenhenger",
             "Vekstfaktor og prosentvis endring",
             "Budsjett og regnskap",
             "Lån, renter og sparing",
             "Indeksregulering",
             "Valutaberegninger",
-        ],
-        "Funksjoner og modeller": [
+        ),
+        "Funksjoner og modeller": (
             "Lineære modeller i praksis",
             "Eksponentiell vekst og nedbryting",
             "Modellering med regresjon",
             "Tolke og bruke grafiske fremstillinger",
             "Digitale verktøy for modellering",
-        ],
-        "Statistikk": [
+        ),
+        "Statistikk": (
             "Sentralmål og spredningsmål",
             "Normalfordelingen",
             "Standardavvik og varians",
             "Korrelasjon og regresjon",
             "Statistiske undersøkelser",
             "Feilkilder i statistikk",
-        ],
-        "Sannsynlighet": [
+        ),
+        "Sannsynlighet": (
             "Betinget sannsynlighet",
             "Uavhengige og avhengige hendelser",
             "Sannsynlighetstre og krysstabell",
             "Simulering med digitale verktøy",
-        ],
-        "Geometri": [
+        ),
+        "Geometri": (
             "Trigonometri i praktiske oppgaver",
             "Arealberegning av sammensatte figurer",
             "Volumberegning",
             "Målestokk og kart",
-        ],
+        ),
     },
     "VG2 R1": {
-        "Algebra": [
+        "Algebra": (
             "Polynomdivisjon",
             "Faktorisering av polynomer",
             "Nullpunkter til polynomer",
@@ -370,16 +374,16 @@ TOPIC_LIBRARY = {
             "Eksponential- og logaritmefunksjoner",
             "Likninger med logaritmer",
             "Eksponentiallikninger",
-        ],
-        "Funksjoner": [
+        ),
+        "Funksjoner": (
             "Polynomfunksjoner og egenskaper",
             "Rasjonale funksjoner og asymptoter",
             "Sammensetning av funksjoner",
             "Kontinuitet",
             "Grenseverdier",
             "Definisjon av grenseverdi",
-        ],
-        "Derivasjon": [
+        ),
+        "Derivasjon": (
             "Definisjon av derivasjon",
             "Derivasjon fra definisjonen",
             "Derivasjonsregler",
@@ -391,25 +395,25 @@ TOPIC_LIBRARY = {
             "Ekstremalpunkter",
             "Vendepunkter",
             "Optimering",
-        ],
-        "Geometri": [
+        ),
+        "Geometri": (
             "Vektorer i rommet",
             "Skalarprodukt i rommet",
             "Vektorprodukt",
             "Parametriske kurver",
             "Linjer i rommet",
             "Planet i rommet",
-        ],
-        "Kombinatorikk og sannsynlighet": [
+        ),
+        "Kombinatorikk og sannsynlighet": (
             "Kombinatorikk - repetisjon",
             "Sannsynlighetsmodeller",
             "Binomisk sannsynlighetsmodell",
             "Binomialfordelingen",
             "Forventningsverdi og standardavvik",
-        ],
+        ),
     },
     "VG3 R2": {
-        "Funksjoner og derivasjon": [
+        "Funksjoner og derivasjon": (
             "Trigonometriske funksjoner",
             "Derivasjon av trigonometriske funksjoner",
             "Logaritme- og eksponentialfunksjoner",
@@ -417,8 +421,8 @@ TOPIC_LIBRARY = {
             "Anvendelser av derivasjon",
             "Relaterte rater",
             "Linearisering",
-        ],
-        "Integralregning": [
+        ),
+        "Integralregning": (
             "Ubestemte integraler",
             "Integrasjonsregler",
             "Integrasjon ved substitusjon",
@@ -428,44 +432,44 @@ TOPIC_LIBRARY = {
             "Areal under kurver",
             "Areal mellom kurver",
             "Volum av omdreiningslegemer",
-        ],
-        "Differensiallikninger": [
+        ),
+        "Differensiallikninger": (
             "Separable differensiallikninger",
             "Lineære førsteordens differensiallikninger",
             "Lineære andreordens differensiallikninger",
             "Modellering med differensiallikninger",
             "Vekstmodeller",
-        ],
-        "Rekker": [
+        ),
+        "Rekker": (
             "Aritmetiske rekker",
             "Geometriske rekker",
             "Uendelige geometriske rekker",
             "Konvergens og divergens",
             "Teleskoprekker",
             "Taylorrekker (introduksjon)",
-        ],
+        ),
     },
 }
 
 # LK20 Kompetansemål (utvidet med flere trinn)
 COMPETENCY_GOALS = {
-    "1.-4. trinn": [
+    "1.-4. trinn": (
         "Telle til 100, dele opp og bygge mengder opp til 10, sette sammen og dele opp tiergrupper",
         "Utvikle, bruke og samtale om varierte regnestrategier for addisjon og subtraksjon",
         "Utforske og beskrive strukturer og mønster i lek og spill",
         "Bruke ulike måleenheter for lengde og masse i praktiske situasjoner",
         "Utforske, lage og beskrive geometriske mønster med og uten digitale verktøy",
         "Samle, sortere og forklare data og lage enkle fremstillinger",
-    ],
-    "5.-7. trinn": [
+    ),
+    "5.-7. trinn": (
         "Utforske og beskrive primtall, faktorisering og bruke det til å finne fellesnevner",
         "Sammenligne, ordne og regne med negative tall",
         "Beskrive plassering og forflytning i et koordinatsystem",
         "Utforske og bruke strategier for regning med desimaltall, brøk og prosent",
         "Utforske og argumentere for formler for omkrets, areal og volum",
         "Samle inn, sortere, presentere og lese av data og vurdere om fremstillingene er hensiktsmessige",
-    ],
-    "8. trinn": [
+    ),
+    "8. trinn": (
         "Utforske og beskrive strukturer og forandringer i geometriske mønster",
         "Beskrive og generalisere mønster med bokstaver og andre symboler",
         "Utforske og øve på strategier for regning med brøk, desimaltall og prosent",
@@ -474,8 +478,8 @@ COMPETENCY_GOALS = {
         "Utforske Pytagoras' setning og bruke den til å beregne lengder",
         "Utforske og argumentere for formler for areal og volum",
         "Samle inn, sortere og vurdere data og presentere med og uten digitale verktøy",
-    ],
-    "9. trinn": [
+    ),
+    "9. trinn": (
         "Behandle og faktorisere algebraiske uttrykk, og bruke dette i likninger og ulikheter",
         "Modellere situasjoner knyttet til reelle datasett og vurdere modellene",
         "Utforske og beskrive ulike representasjoner av funksjoner",
@@ -484,8 +488,8 @@ COMPETENCY_GOALS = {
         "Beregne og vurdere renter ved lån og sparing",
         "Bruke formlikhet og trigonometri til å beregne lengder og vinkler",
         "Planlegge, gjennomføre og presentere statistiske undersøkelser",
-    ],
-    "10. trinn": [
+    ),
+    "10. trinn": (
         "Utforske matematiske egenskaper og sammenhenger ved å bruke programmering",
         "Behandle og faktorisere enkle algebraiske uttrykk, og regne med formler",
         "Løse likninger og ulikheter av første og andre grad",
@@ -494,46 +498,46 @@ COMPETENCY_GOALS = {
         "Bruke trigonometri til å beregne lengder og vinkler i praktiske oppgaver",
         "Beregne overflate og volum av sylinder, kjegle og kule",
         "Vurdere og drøfte sannsynligheter ved hjelp av simuleringer",
-    ],
-    "VG1 1T": [
+    ),
+    "VG1 1T": (
         "Omforme og forenkle sammensatte uttrykk, løse likninger og ulikheter",
         "Utforske, analysere og drøfte polynomfunksjoner og rasjonale funksjoner",
         "Utforske, forstå og bruke eksponentialfunksjoner og logaritmer",
         "Bruke trigonometri til beregninger og problemløsning",
         "Bruke vektorer til å beskrive bevegelse, beregne lengder og finne vinkler",
         "Kombinatorikk og sannsynlighetsberegning med ordnet og uordnet utvalg",
-    ],
-    "VG1 1P": [
+    ),
+    "VG1 1P": (
         "Planlegge, gjennomføre og presentere selvstendig arbeid knyttet til økonomi",
         "Bruke funksjonsbegrepet i praktiske sammenhenger og gjøre rede for lineære modeller",
         "Analysere og presentere et datamateriale og drøfte ulike dataframstillinger",
         "Gjøre rede for og bruke formler i praktiske situasjoner",
         "Bruke trigonometri til beregninger i praktiske sammenhenger",
-    ],
-    "VG2 2P": [
+    ),
+    "VG2 2P": (
         "Bruke prosent, prosentpoeng og vekstfaktor i ulike sammenhenger",
         "Planlegge, gjennomføre og presentere selvstendig arbeid knyttet til personlig økonomi",
         "Lage, tolke og drøfte funksjoner som modellerer praktiske situasjoner",
         "Gjennomføre statistiske undersøkelser og drøfte resultater kritisk",
         "Beregne og tolke sentralmål, spredningsmål og korrelasjon",
         "Bruke normalfordelingen til å beregne sannsynligheter",
-    ],
-    "VG2 R1": [
+    ),
+    "VG2 R1": (
         "Finne grenseverdier og drøfte kontinuitet til funksjoner",
         "Derivere og drøfte polynomfunksjoner, rasjonale funksjoner og eksponentialfunksjoner",
         "Løse likninger med eksponential- og logaritmefunksjoner analytisk og grafisk",
         "Bruke derivasjon til å løse praktiske optimeringsproblemer",
         "Gjøre rede for vektorer i rommet og regne med skalarproduktet",
         "Gjøre rede for binomisk sannsynlighetsmodell og bruke den til beregninger",
-    ],
-    "VG3 R2": [
+    ),
+    "VG3 R2": (
         "Derivere og integrere trigonometriske funksjoner",
         "Bruke ulike teknikker for integrasjon av funksjoner",
         "Beregne areal mellom kurver og volum av omdreiningslegemer",
         "Løse separable og lineære differensiallikninger analytisk",
         "Gjøre rede for uendelige rekker og bestemme konvergens",
         "Modellere praktiske situasjoner med differensiallikninger",
-    ],
+    ),
 }
 
 # Oppgavetyper
@@ -591,7 +595,7 @@ GRADE_BOUNDARIES = {
     "1.-4. trinn": {
         "description": "Barnetrinnet - konkret, lekbasert matematikk",
         "cognitive_level": "Konkret-operasjonelt",
-        "allowed_concepts": [
+        "allowed_concepts": (
             "Addisjon og subtraksjon opp til 1000",
             "Multiplikasjon (gangetabellen 1-10)",
             "Enkel divisjon med og uten rest",
@@ -600,8 +604,8 @@ GRADE_BOUNDARIES = {
             "Klokka og tid",
             "Penger og kroner",
             "Lengde, vekt og volum (enkle enheter)",
-        ],
-        "forbidden_concepts": [
+        ),
+        "forbidden_concepts": (
             "Negative tall",
             "Desimaltall med mer enn én desimal",
             "Algebra og variabler",
@@ -609,26 +613,26 @@ GRADE_BOUNDARIES = {
             "Prosent",
             "Brøkregning (addisjon/subtraksjon av brøker)",
             "Vinkelmåling",
-        ],
+        ),
         "number_complexity": {
             "max_value": 10000,
             "allow_negative": False,
             "allow_decimals": False,
             "allow_fractions": True,
-            "fraction_types": ["enkel"],  # 1/2, 1/4, 3/4
+            "fraction_types": ("enkel",),  # 1/2, 1/4, 3/4
         },
-        "example_exercises": [
+        "example_exercises": (
             "23 + 45 = ?",
             "8 × 7 = ?",
             "Del sirkelen i 4 like deler. Fargelegg 3/4.",
             "Klokka er halv tre. Tegn viserne.",
             "Marie har 50 kr. Hun kjøper en is til 25 kr. Hvor mye har hun igjen?",
-        ],
-        "too_hard_examples": [
+        ),
+        "too_hard_examples": (
             "Løs likningen x + 5 = 12",  # Algebra
             "Regn ut 25% av 80",  # Prosent
             "Finn arealet når lengden er 5,5 cm",  # Desimaltall
-        ],
+        ),
         "difficulty_definitions": {
             "lett": "Ensifrede tall, direkte operasjon, visuell støtte",
             "middels": "Tosifrede tall, tierovergang, enkel tekstoppgave",
@@ -638,7 +642,7 @@ GRADE_BOUNDARIES = {
     "5.-7. trinn": {
         "description": "Mellomtrinnet - overgang til abstrakt tenkning",
         "cognitive_level": "Konkret til formell-operasjonelt",
-        "allowed_concepts": [
+        "allowed_concepts": (
             "Negative tall på tallinja",
             "Desimaltall",
             "Brøkregning (addisjon, subtraksjon, multiplikasjon)",
@@ -648,8 +652,8 @@ GRADE_BOUNDARIES = {
             "Vinkler og vinkelmåling",
             "Areal og omkrets av enkle figurer",
             "Gjennomsnitt, median, typetall",
-        ],
-        "forbidden_concepts": [
+        ),
+        "forbidden_concepts": (
             "Potenser med negative eksponenter",
             "Andregradsuttrykk",
             "Pytagoras' setning",
@@ -657,7 +661,7 @@ GRADE_BOUNDARIES = {
             "Ligningssett",
             "Sannsynlighetsregning med multiplikasjon",
             "Rentesrente",
-        ],
+        ),
         "number_complexity": {
             "max_value": 1000000,
             "allow_negative": True,
@@ -665,22 +669,22 @@ GRADE_BOUNDARIES = {
             "max_decimal_places": 2,
             "allow_fractions": True,
         },
-        "example_exercises": [
+        "example_exercises": (
             "Regn ut 3/4 + 1/2",
             "Finn 25% av 80 kr",
             "Hva er gjennomsnittet av 12, 15, 18 og 23?",
             "Finn arealet av et rektangel med lengde 8 cm og bredde 5 cm",
             "Plasser punktet (3, 4) i koordinatsystemet",
-        ],
-        "too_easy_examples": [
+        ),
+        "too_easy_examples": (
             "5 + 3 = ?",  # For enkelt
             "Tegn en trekant",  # For enkelt
-        ],
-        "too_hard_examples": [
+        ),
+        "too_hard_examples": (
             "Løs likningen 2x + 3 = x - 4",  # Ukjent på begge sider
             "Bruk Pytagoras til å finne hypotenusen",  # 8. trinn
             "Finn stigningstallet til funksjonen",  # 8. trinn
-        ],
+        ),
         "difficulty_definitions": {
             "lett": "Én operasjon, pene tall, direkte anvendelse av formel",
             "middels": "To operasjoner, brøker/desimaler, enkel tekstoppgave",
@@ -690,7 +694,7 @@ GRADE_BOUNDARIES = {
     "8. trinn": {
         "description": "Starten på ungdomstrinnet - algebra og funksjoner introduseres",
         "cognitive_level": "Formell-operasjonelt",
-        "allowed_concepts": [
+        "allowed_concepts": (
             "Potenser og potensregler",
             "Kvadratrot",
             "Bokstavregning og forenkling",
@@ -701,8 +705,8 @@ GRADE_BOUNDARIES = {
             "Koordinatsystem med alle fire kvadranter",
             "Lineære sammenhenger (tabell, graf, formel)",
             "Prosentvis økning og reduksjon",
-        ],
-        "forbidden_concepts": [
+        ),
+        "forbidden_concepts": (
             "Ligningssett med to ukjente",
             "Standardform (vitenskapelig notasjon)",
             "Rentesrente-formelen",
@@ -711,7 +715,7 @@ GRADE_BOUNDARIES = {
             "Faktorisering av andregradsuttrykk",
             "Eksponentialfunksjoner",
             "Andregradsformelen",
-        ],
+        ),
         "number_complexity": {
             "max_value": 10000000,
             "allow_negative": True,
@@ -722,24 +726,24 @@ GRADE_BOUNDARIES = {
             "allow_powers": True,
             "max_power": 3,
         },
-        "example_exercises": [
+        "example_exercises": (
             "Løs likningen 3x + 7 = 2x - 5",
             "Forenkle uttrykket 4a + 3b - 2a + 5b",
             "En rettvinklet trekant har kateter 3 cm og 4 cm. Finn hypotenusen.",
             "Finn arealet av en sirkel med radius 5 cm",
             "Les av koordinatene til punktene A, B og C i koordinatsystemet",
             "En vare koster 400 kr. Den settes ned 20%. Hva er ny pris?",
-        ],
-        "too_easy_examples": [
+        ),
+        "too_easy_examples": (
             "Regn ut 3 × 7",  # Barnetrinn
             "Hva er 50% av 100?",  # For direkte
-        ],
-        "too_hard_examples": [
+        ),
+        "too_hard_examples": (
             "Løs likningssettet x + y = 5 og 2x - y = 4",  # 9. trinn
             "Finn sin(30°)",  # 10. trinn
             "Løs x² - 5x + 6 = 0",  # 10. trinn
             "Beregn renter og rentes rente over 3 år",  # 9. trinn
-        ],
+        ),
         "difficulty_definitions": {
             "lett": "Direkte anvendelse av én formel/regel, positive heltall",
             "middels": "Kombinere to konsepter, negative tall eller desimaler",
@@ -749,7 +753,7 @@ GRADE_BOUNDARIES = {
     "9. trinn": {
         "description": "Ungdomstrinnet - økonomi, ligningssett og dypere funksjonsforståelse",
         "cognitive_level": "Formell-operasjonelt",
-        "allowed_concepts": [
+        "allowed_concepts": (
             "Potenser med negative eksponenter",
             "Standardform (vitenskapelig notasjon)",
             "Faktorisering av algebraiske uttrykk",
@@ -760,8 +764,8 @@ GRADE_BOUNDARIES = {
             "Rentesrente og vekstfaktor",
             "Budsjett og regnskap",
             "Kombinatorikk og valgtre",
-        ],
-        "forbidden_concepts": [
+        ),
+        "forbidden_concepts": (
             "Andregradslikninger",
             "Andregradsformelen (abc-formelen)",
             "Andregradsfunksjoner (parabler)",
@@ -769,7 +773,7 @@ GRADE_BOUNDARIES = {
             "Eksponentialfunksjoner (som funksjonstype)",
             "Faktorisering av andregradsuttrykk",
             "Toppunkt/bunnpunkt",
-        ],
+        ),
         "number_complexity": {
             "max_value": 100000000,
             "allow_negative": True,
@@ -778,22 +782,22 @@ GRADE_BOUNDARIES = {
             "allow_scientific_notation": True,
             "allow_growth_factors": True,
         },
-        "example_exercises": [
+        "example_exercises": (
             "Løs likningssettet: x + y = 10 og 2x - y = 5",
             "Skriv 0,00045 på standardform",
             "Du setter 10 000 kr i banken med 3% rente. Hvor mye har du etter 5 år?",
             "Finn stigningstallet og konstantleddet til linjen gjennom (0, 3) og (2, 7)",
             "Faktoriser uttrykket 6x + 9",
-        ],
-        "too_easy_examples": [
+        ),
+        "too_easy_examples": (
             "Løs x + 5 = 12",  # 8. trinn
             "Finn arealet av en sirkel",  # 8. trinn (direkte)
-        ],
-        "too_hard_examples": [
+        ),
+        "too_hard_examples": (
             "Løs x² - 4x - 5 = 0",  # 10. trinn
             "Finn nullpunktene til f(x) = x² - 4",  # 10. trinn
             "Beregn sin(45°)",  # 10. trinn
-        ],
+        ),
         "difficulty_definitions": {
             "lett": "Standard ligningssett, enkle vekstfaktorer",
             "middels": "Praktisk økonomioppgave, tolke lineære funksjoner",
@@ -803,7 +807,7 @@ GRADE_BOUNDARIES = {
     "10. trinn": {
         "description": "Avslutning av ungdomstrinnet - andregradsuttrykk og trigonometri",
         "cognitive_level": "Formell-operasjonelt, forberedelse til VGS",
-        "allowed_concepts": [
+        "allowed_concepts": (
             "Rasjonale og irrasjonale tall",
             "Faktorisering av andregradsuttrykk",
             "Konjugatsetningen og kvadratsetningene",
@@ -815,8 +819,8 @@ GRADE_BOUNDARIES = {
             "Eksponentialfunksjoner (enkel)",
             "Volum av kjegle, sylinder og kule",
             "Histogram og boksplott",
-        ],
-        "forbidden_concepts": [
+        ),
+        "forbidden_concepts": (
             "Sinussetningen og cosinussetningen",
             "Radianer",
             "Logaritmer",
@@ -825,7 +829,7 @@ GRADE_BOUNDARIES = {
             "Vektorer",
             "Binomisk sannsynlighet",
             "Kontinuitet og grenseverdier",
-        ],
+        ),
         "number_complexity": {
             "max_value": 1000000000,
             "allow_negative": True,
@@ -833,23 +837,23 @@ GRADE_BOUNDARIES = {
             "allow_irrational": True,
             "allow_quadratic_solutions": True,
         },
-        "example_exercises": [
+        "example_exercises": (
             "Løs andregradslikningen x² - 5x + 6 = 0",
             "Faktoriser x² - 9 ved hjelp av konjugatsetningen",
             "Finn toppunktet til f(x) = -x² + 4x - 3",
             "En stige på 5 m står mot en vegg. Bunnen er 3 m fra veggen. Hvor høyt opp når stigen?",
             "Finn vinkelen A i en rettvinklet trekant der motstående katet er 4 og hosliggende er 3",
             "Finn volumet av en kule med radius 6 cm",
-        ],
-        "too_easy_examples": [
+        ),
+        "too_easy_examples": (
             "Løs 3x + 2 = 11",  # 8. trinn
             "Finn arealet av et rektangel",  # Mellomtrinn
-        ],
-        "too_hard_examples": [
+        ),
+        "too_hard_examples": (
             "Bruk sinussetningen til å finne siden a",  # VG1
             "Derivér f(x) = x³ - 2x",  # VG2
             "Løs ln(x) = 2",  # VG1
-        ],
+        ),
         "difficulty_definitions": {
             "lett": "Faktorisering med pene tall, direkte trigonometri",
             "middels": "Abc-formelen med heltallssvar, finne toppunkt",
@@ -859,7 +863,7 @@ GRADE_BOUNDARIES = {
     "VG1 1T": {
         "description": "Teoretisk matematikk VG1 - dypere algebra, logaritmer, vektorer",
         "cognitive_level": "Abstrakt, formelt",
-        "allowed_concepts": [
+        "allowed_concepts": (
             "Polynomfunksjoner",
             "Rasjonale funksjoner",
             "Eksponentialfunksjoner og logaritmer",
@@ -870,8 +874,8 @@ GRADE_BOUNDARIES = {
             "Vektorer i planet",
             "Skalarprodukt",
             "Kombinatorikk (permutasjoner, kombinasjoner)",
-        ],
-        "forbidden_concepts": [
+        ),
+        "forbidden_concepts": (
             "Derivasjon",
             "Grenseverdier og kontinuitet",
             "Integrasjon",
@@ -879,22 +883,22 @@ GRADE_BOUNDARIES = {
             "Differensiallikninger",
             "Binomialfordelingen (avansert)",
             "Taylorrekker",
-        ],
-        "example_exercises": [
+        ),
+        "example_exercises": (
             "Løs likningen 2^x = 16",
             "Forenkle lg(100) + lg(10)",
             "Finn alle sidene i en trekant der a = 5, B = 40° og C = 60°",
             "Gitt vektorene a = [3, 4] og b = [1, 2]. Finn a · b",
             "På hvor mange måter kan 5 personer stille seg i kø?",
-        ],
-        "too_easy_examples": [
+        ),
+        "too_easy_examples": (
             "Løs x² - 4 = 0",  # 10. trinn
             "Finn sin(30°)",  # 10. trinn (direkte oppslag)
-        ],
-        "too_hard_examples": [
+        ),
+        "too_hard_examples": (
             "Finn f'(x) når f(x) = x³",  # R1
             "Beregn ∫x² dx",  # R2
-        ],
+        ),
         "difficulty_definitions": {
             "lett": "Standard logaritmeregning, enkel vektorregning",
             "middels": "Sinussetningen med ukjent vinkel, sammensatt eksponentiallikning",
@@ -904,7 +908,7 @@ GRADE_BOUNDARIES = {
     "VG1 1P": {
         "description": "Praktisk matematikk VG1 - økonomi, statistikk, praktiske anvendelser",
         "cognitive_level": "Anvendt, praktisk",
-        "allowed_concepts": [
+        "allowed_concepts": (
             "Prosentregning og vekstfaktor",
             "Lån, renter og avdrag",
             "Annuitetslån og serielån",
@@ -913,21 +917,21 @@ GRADE_BOUNDARIES = {
             "Regresjon med digitale verktøy",
             "Statistisk analyse",
             "Praktisk trigonometri",
-        ],
-        "forbidden_concepts": [
+        ),
+        "forbidden_concepts": (
             "Logaritmer",
             "Polynomfunksjoner av høy grad",
             "Vektorer",
             "Derivasjon",
             "Formelle bevis",
             "Kombinatorikk (permutasjoner/kombinasjoner)",
-        ],
-        "example_exercises": [
+        ),
+        "example_exercises": (
             "Du tar opp et lån på 200 000 kr med 5% rente. Hva er månedlig annuitet over 10 år?",
             "Lag et budsjett for en student med inntekt 10 000 kr/mnd",
             "En stige på 6 m lener mot en vegg og danner 70° med bakken. Hvor høyt når den?",
             "Analyser dette datasettet og finn gjennomsnitt, median og standardavvik",
-        ],
+        ),
         "difficulty_definitions": {
             "lett": "Direkte prosentregning, enkel renteutregning",
             "middels": "Sammenligne låntyper, tolke statistikk",
@@ -937,7 +941,7 @@ GRADE_BOUNDARIES = {
     "VG2 2P": {
         "description": "Praktisk matematikk VG2 - økonomi, statistikk, modellering",
         "cognitive_level": "Anvendt, praktisk, hverdagsrelatert",
-        "allowed_concepts": [
+        "allowed_concepts": (
             "Prosentregning og vekstfaktor",
             "Lån, renter, sparing, budsjett",
             "Lineære og eksponentielle modeller",
@@ -947,27 +951,27 @@ GRADE_BOUNDARIES = {
             "Korrelasjon",
             "Betinget sannsynlighet",
             "Trigonometri i praktiske sammenhenger",
-        ],
-        "forbidden_concepts": [
+        ),
+        "forbidden_concepts": (
             "Derivasjon",
             "Integrasjon",
             "Vektorer i rommet",
             "Komplekse tall",
             "Formelle bevis",
             "Abstrakt algebra",
-        ],
-        "example_exercises": [
+        ),
+        "example_exercises": (
             "Du låner 200 000 kr til 4,5 % rente. Hva er månedlig terminbeløp over 5 år?",
             "En by hadde 25 000 innbyggere i 2020 og vokser med 1,8 % per år. Lag en modell.",
             "Finn gjennomsnitt, median og standardavvik for datasettet: 12, 15, 18, 22, 25, 28",
             "En vare kostet 450 kr. Prisen øker med 12 %. Hva er ny pris?",
             "Bruk normalfordelingen: Høyden til elever er normalfordelt med μ=170 og σ=8. Finn P(X > 180).",
-        ],
-        "too_hard_examples": [
+        ),
+        "too_hard_examples": (
             "Derivér f(x) = x³ - 3x",
             "Finn grenseverdien lim (x→0) sin(x)/x",
             "Beregn vektorproduktet",
-        ],
+        ),
         "difficulty_definitions": {
             "lett": "Enkel prosentregning, lese av diagram, finne gjennomsnitt",
             "middels": "Vekstfaktor over tid, normalfordeling, regresjon",
@@ -977,7 +981,7 @@ GRADE_BOUNDARIES = {
     "VG2 R1": {
         "description": "Realfagsmatematikk 1 - derivasjon, vektorer i rommet, grenseverdier",
         "cognitive_level": "Avansert abstrakt",
-        "allowed_concepts": [
+        "allowed_concepts": (
             "Grenseverdier",
             "Kontinuitet",
             "Derivasjon fra definisjonen",
@@ -989,21 +993,21 @@ GRADE_BOUNDARIES = {
             "Vektorprodukt",
             "Linjer og plan i rommet",
             "Binomialfordelingen",
-        ],
-        "forbidden_concepts": [
+        ),
+        "forbidden_concepts": (
             "Integrasjon",
             "Differensiallikninger",
             "Taylorrekker",
             "Partielle deriverte",
             "Multivariabel kalkulus",
-        ],
-        "example_exercises": [
+        ),
+        "example_exercises": (
             "Derivér f(x) = x³ - 3x² + 2x",
             "Finn ekstremalpunktene til f(x) = x³ - 6x² + 9x + 1",
             "Finn likningen for tangenten til f(x) = x² i punktet (2, 4)",
             "Finn vektorproduktet av a = [1, 2, 3] og b = [4, 5, 6]",
             "En boks uten lokk skal ha volum 500 cm³. Finn dimensjonene som gir minst materialbruk",
-        ],
+        ),
         "difficulty_definitions": {
             "lett": "Standard derivasjon, finne ekstremalpunkt",
             "middels": "Kjerneregelen, drøfting av rasjonal funksjon",
@@ -1013,7 +1017,7 @@ GRADE_BOUNDARIES = {
     "VG3 R2": {
         "description": "Realfagsmatematikk 2 - integrasjon, differensiallikninger, rekker",
         "cognitive_level": "Høyt abstrakt, universitetsforberedende",
-        "allowed_concepts": [
+        "allowed_concepts": (
             "Integrasjon (alle teknikker)",
             "Substitusjon og delvis integrasjon",
             "Areal mellom kurver",
@@ -1023,20 +1027,20 @@ GRADE_BOUNDARIES = {
             "Aritmetiske og geometriske rekker",
             "Konvergens og divergens",
             "Trigonometriske funksjoner (derivasjon/integrasjon)",
-        ],
-        "forbidden_concepts": [
+        ),
+        "forbidden_concepts": (
             "Partielle differensiallikninger",
             "Fourierrekker",
             "Komplekse tall (avansert)",
             "Lineær algebra (matriser)",
-        ],
-        "example_exercises": [
+        ),
+        "example_exercises": (
             "Beregn ∫(2x + 1)³ dx ved substitusjon",
             "Finn arealet mellom y = x² og y = x",
             "Løs differensiallikningen dy/dx = 2xy",
             "Finn summen av den uendelige rekken 1 + 1/2 + 1/4 + 1/8 + ...",
             "Finn volumet når området mellom y = √x og x-aksen fra x=0 til x=4 roteres om x-aksen",
-        ],
+        ),
         "difficulty_definitions": {
             "lett": "Standard integrasjon, enkel separabel diff.likn.",
             "middels": "Delvis integrasjon, areal mellom kurver",
@@ -1154,41 +1158,107 @@ TIME_ESTIMATES = {
 }
 
 
-def get_topics_for_grade(grade: str) -> dict:
-    """Get topics organized by category for a specific grade level."""
-    # Normalize grade name
-    grade_key = grade
-    for key in TOPIC_LIBRARY.keys():
-        if grade.lower() in key.lower() or key.lower() in grade.lower():
-            grade_key = key
-            break
+# The data above is read-only: freeze it so it can be shared by reference
+# (cache_resource, callers) without defensive copies
+TOPIC_LIBRARY = MappingProxyType({
+    grade: MappingProxyType(categories) for grade, categories in TOPIC_LIBRARY.items()
+})
+COMPETENCY_GOALS = MappingProxyType(COMPETENCY_GOALS)
+EXERCISE_TYPES = MappingProxyType({key: MappingProxyType(info) for key, info in EXERCISE_TYPES.items()})
+
+
+def _match_grade_key(grade: str, keys) -> str:
+    """Return the first key that contains grade or is contained in it (case-insensitive)."""
+    grade_lower = grade.lower()
+    for key in keys:
+        if grade_lower in key.lower() or key.lower() in grade_lower:
+            return key
+    return grade
+
+
+def _build_grade_index(library: dict) -> dict[str, str]:
+    """
+    Map lowercased grade aliases to their canonical key in library.
     
-    return TOPIC_LIBRARY.get(grade_key, {})
+    Aliases are each key itself, its trinn number ("8") and its course
+    code ("1t"). Every alias maps to what _match_grade_key resolves it to,
+    so indexed and scanned lookups always agree.
+    """
+    index = {}
+    for key in library:
+        key_lower = key.lower()
+        if key_lower.endswith("trinn"):
+            aliases = {key_lower, key_lower.split(".")[0]}
+        else:
+            aliases = {key_lower, key_lower.split()[-1]}
+        for alias in aliases:
+            index.setdefault(alias, _match_grade_key(alias, library))
+    return index
+
+
+_TOPIC_INDEX = _build_grade_index(TOPIC_LIBRARY)
+_GOAL_INDEX = _build_grade_index(COMPETENCY_GOALS)
+_EMPTY_MAPPING = MappingProxyType({})
 
+# All topics per grade in category order, built once
+_FLAT_TOPICS = {
+    grade: tuple(topic for topics in categories.values() for topic in topics)
+    for grade, categories in TOPIC_LIBRARY.items()
+}
+
+# Topics keyed by (grade, category), one probe instead of two
+_CATEGORY_TOPICS = {
+    (grade, category): topics
+    for grade, categories in TOPIC_LIBRARY.items()
+    for category, topics in categories.items()
+}
 
-def get_all_topics_flat(grade: str) -> list:
-    """Get a flat list of all topics for a grade."""
-    topics = get_topics_for_grade(grade)
-    flat_list = []
-    for category, topic_list in topics.items():
-        flat_list.extend(topic_list)
-    return flat_list
 
+def _build_topic_categories() -> dict[tuple[str, str], str]:
+    """Map (grade, topic) to the first category listing the topic."""
+    categories: dict[tuple[str, str], str] = {}
+    for (grade, category), topics in _CATEGORY_TOPICS.items():
+        for topic in topics:
+            categories.setdefault((grade, topic), category)
+    return categories
 
-def get_competency_goals(grade: str) -> list:
+
+_TOPIC_CATEGORY = _build_topic_categories()
+
+
+@lru_cache(maxsize=64)
+def _resolve_grade_key(grade: str, library: str = "topics") -> str:
+    """Canonical TOPIC_LIBRARY ("topics") or COMPETENCY_GOALS ("goals") key for grade."""
+    if library == "goals":
+        index, keys = _GOAL_INDEX, COMPETENCY_GOALS
+    else:
+        index, keys = _TOPIC_INDEX, TOPIC_LIBRARY
+    # Known aliases are a dict hit, anything else is scanned
+    return index.get(grade.lower()) or _match_grade_key(grade, keys)
+
+
+def get_topics_for_grade(grade: str) -> Mapping[str, tuple[str, ...]]:
+    """Get topics organized by category for a specific grade level (read-only)."""
+    return TOPIC_LIBRARY.get(_resolve_grade_key(grade), _EMPTY_MAPPING)
+
+
+def get_all_topics_flat(grade: str) -> tuple[str, ...]:
+    """Get all topics for a grade as one flat tuple."""
+    return _FLAT_TOPICS.get(_resolve_grade_key(grade), ())
+
+
+def get_topics_for_category(grade: str, category: str) -> tuple[str, ...]:
+    """Get the topics in one category for a grade level."""
+    return _CATEGORY_TOPICS.get((_resolve_grade_key(grade), category), ())
+
+
+def get_competency_goals(grade: str) -> tuple[str, ...]:
     """Get competency goals for a specific grade level."""
-    # Normalize grade name
-    grade_key = grade
-    for key in COMPETENCY_GOALS.keys():
-        if grade.lower() in key.lower() or key.lower() in grade.lower():
-            grade_key = key
-            break
-    
-    return COMPETENCY_GOALS.get(grade_key, [])
+    return COMPETENCY_GOALS.get(_resolve_grade_key(grade, "goals"), ())
 
 
-def get_exercise_types() -> dict:
-    """Get all available exercise types."""
+def get_exercise_types() -> Mapping[str, Mapping[str, str]]:
+    """Get all available exercise types (read-only)."""
     return EXERCISE_TYPES
 
 
@@ -1276,17 +1346,11 @@ def get_related_topics(topic: str, grade: str) -> list[str]:
     Returns:
         List of related topic names.
     """
-    topics_by_category = get_topics_for_grade(grade)
-    
-    # Find which category the topic belongs to
-    topic_category = None
-    for category, topics in topics_by_category.items():
-        if topic in topics:
-            topic_category = category
-            break
+    grade_key = _resolve_grade_key(grade)
+    topic_category = _TOPIC_CATEGORY.get((grade_key, topic))
     
     if not topic_category:
         return []
     
     # Return other topics in the same category
-    return [t for t in topics_by_category[topic_category] if t != topic]
+    return [t for t in _CATEGORY_TOPICS[(grade_key, topic_category)] if t != topic]
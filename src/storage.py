@@ -4,11 +4,21 @@ Handles saving and loading history, settings, and generated content.
 """
 
 import json
+import logging
 import os
 import uuid
+from dataclasses import asdict, dataclass, field, fields
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+
+# Optional faster JSON backend (falls back to stdlib json)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
 
 
 # Storage directory
@@ -17,17 +27,65 @@ HISTORY_FILE = STORAGE_DIR / "history.json"
 SETTINGS_FILE = STORAGE_DIR / "settings.json"
 
 
+@dataclass(slots=True)
+class HistoryEntry:
+    """A single generation in the history (slots keep session snapshots small)."""
+    id: str
+    topic: str
+    grade: str
+    material_type: str
+    timestamp: str
+    tex_file: str | None = None
+    pdf_path: str | None = None
+    settings: dict = field(default_factory=dict)
+
+
+_HISTORY_FIELDS = frozenset(f.name for f in fields(HistoryEntry))
+
+# Defaults for required fields, so older or hand-edited rows still load
+_HISTORY_DEFAULTS = {"id": "", "topic": "", "grade": "", "material_type": "", "timestamp": ""}
+
+
+def _entry_from_dict(data) -> HistoryEntry | None:
+    """Build a HistoryEntry from a stored row, or None if the row is unusable."""
+    if not isinstance(data, dict):
+        return None
+    values = {**_HISTORY_DEFAULTS, **{k: v for k, v in data.items() if k in _HISTORY_FIELDS}}
+    try:
+        return HistoryEntry(**values)
+    except TypeError:
+        return None
+
+
 def ensure_storage_dir():
     """Ensure the storage directory exists."""
     STORAGE_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def load_history() -> list[dict]:
+def _read_json(path: Path):
+    """Read a JSON file, using orjson when available."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(path.read_bytes())
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_json(path: Path, data) -> None:
+    """Write data as indented UTF-8 JSON, using orjson when available."""
+    if ORJSON_AVAILABLE:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def _read_history() -> list[HistoryEntry] | None:
     """
-    Load generation history from file.
+    Read the history file.
     
     Returns:
-        List of history entries, newest first.
+        List of history entries (unusable rows skipped), or None if the
+        file exists but could not be read, so callers must not save over it.
     """
     ensure_storage_dir()
     
@@ -35,14 +93,40 @@ def load_history() -> list[dict]:
         return []
     
     try:
-        with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-            history = json.load(f)
-        return history
-    except (json.JSONDecodeError, IOError):
-        return []
+        rows = _read_json(HISTORY_FILE)
+    except (OSError, ValueError):
+        # json.JSONDecodeError and orjson.JSONDecodeError are ValueErrors
+        return None
+    if not isinstance(rows, list):
+        return None
+    
+    entries = (_entry_from_dict(row) for row in rows)
+    return [entry for entry in entries if entry is not None]
+
 
+def _set_aside_history() -> None:
+    """Move an unreadable history file out of the way so history can start over."""
+    corrupt_file = HISTORY_FILE.with_name(
+        f"{HISTORY_FILE.name}.corrupt-{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    )
+    try:
+        os.replace(HISTORY_FILE, corrupt_file)
+        logger.warning(f"Unreadable history file moved to {corrupt_file}; starting a new history")
+    except OSError as e:
+        logger.warning(f"Unreadable history file could not be moved aside: {e}")
 
-def save_history(history: list[dict]) -> bool:
+
+def load_history() -> list[HistoryEntry]:
+    """
+    Load generation history from file.
+    
+    Returns:
+        List of history entries, newest first.
+    """
+    return _read_history() or []
+
+
+def save_history(history: list[HistoryEntry]) -> bool:
     """
     Save generation history to file.
     
@@ -58,10 +142,9 @@ def save_history(history: list[dict]) -> bool:
         # Keep only the last 50 entries
         history = history[:50]
         
-        with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
+        _write_json(HISTORY_FILE, [asdict(e) for e in history])
         return True
-    except IOError:
+    except OSError:
         return False
 
 
@@ -70,9 +153,9 @@ def add_to_history(
     grade: str,
     material_type: str,
     tex_content: str,
-    pdf_path: Optional[str] = None,
-    settings: Optional[dict] = None
-) -> dict:
+    pdf_path: str | None = None,
+    settings: dict | None = None
+) -> HistoryEntry:
     """
     Add a new entry to history.
     
@@ -87,7 +170,11 @@ def add_to_history(
     Returns:
         The new history entry.
     """
-    history = load_history()
+    history = _read_history()
+    if history is None:
+        # Keep the unreadable file for inspection instead of overwriting it
+        _set_aside_history()
+        history = []
     
     # Create unique ID (UUID avoids collisions on rapid generations)
     entry_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
@@ -97,19 +184,19 @@ def add_to_history(
     try:
         with open(tex_file, "w", encoding="utf-8") as f:
             f.write(tex_content)
-    except IOError:
+    except OSError:
         tex_file = None
     
-    entry = {
-        "id": entry_id,
-        "topic": topic,
-        "grade": grade,
-        "material_type": material_type,
-        "timestamp": datetime.now().isoformat(),
-        "tex_file": str(tex_file) if tex_file else None,
-        "pdf_path": pdf_path,
-        "settings": settings or {},
-    }
+    entry = HistoryEntry(
+        id=entry_id,
+        topic=topic,
+        grade=grade,
+        material_type=material_type,
+        timestamp=datetime.now().isoformat(),
+        tex_file=str(tex_file) if tex_file else None,
+        pdf_path=pdf_path,
+        settings=settings or {},
+    )
     
     # Add to beginning of list
     history.insert(0, entry)
@@ -118,7 +205,7 @@ def add_to_history(
     return entry
 
 
-def get_history_entry(entry_id: str) -> Optional[dict]:
+def get_history_entry(entry_id: str) -> HistoryEntry | None:
     """
     Get a specific history entry by ID.
     
@@ -131,13 +218,13 @@ def get_history_entry(entry_id: str) -> Optional[dict]:
     history = load_history()
     
     for entry in history:
-        if entry.get("id") == entry_id:
+        if entry.id == entry_id:
             return entry
     
     return None
 
 
-def get_tex_content(entry_id: str) -> Optional[str]:
+def get_tex_content(entry_id: str) -> str | None:
     """
     Get the LaTeX content for a history entry.
     
@@ -152,17 +239,49 @@ def get_tex_content(entry_id: str) -> Optional[str]:
     if not entry:
         return None
     
-    tex_file = entry.get("tex_file")
-    if not tex_file or not Path(tex_file).exists():
+    tex_file = entry.tex_file
+    if not tex_file:
         return None
     
+    # A missing file surfaces as an OSError, no separate exists() stat needed
     try:
-        with open(tex_file, "r", encoding="utf-8") as f:
+        with open(tex_file, encoding="utf-8") as f:
             return f.read()
-    except IOError:
+    except OSError:
         return None
 
 
+def get_tex_contents(entry_ids: list[str]) -> dict[str, str | None]:
+    """
+    Get the LaTeX content for several history entries with one history load.
+    
+    Args:
+        entry_ids: The entry IDs.
+    
+    Returns:
+        Dict mapping each entry ID to its LaTeX content or None.
+    """
+    wanted = set(entry_ids)
+    tex_files = {
+        entry.id: entry.tex_file
+        for entry in load_history()
+        if entry.id in wanted and entry.tex_file
+    }
+    
+    contents = {}
+    for entry_id in entry_ids:
+        tex_file = tex_files.get(entry_id)
+        contents[entry_id] = None
+        if tex_file:
+            try:
+                with open(tex_file, encoding="utf-8") as f:
+                    contents[entry_id] = f.read()
+            except OSError:
+                pass
+    
+    return contents
+
+
 def delete_history_entry(entry_id: str) -> bool:
     """
     Delete a history entry and its associated files.
@@ -173,17 +292,19 @@ def delete_history_entry(entry_id: str) -> bool:
     Returns:
         True if successful.
     """
-    history = load_history()
+    history = _read_history()
+    if history is None:
+        return False
     
     # Find and remove entry
     for i, entry in enumerate(history):
-        if entry.get("id") == entry_id:
+        if entry.id == entry_id:
             # Delete associated files
-            tex_file = entry.get("tex_file")
-            if tex_file and Path(tex_file).exists():
+            tex_file = entry.tex_file
+            if tex_file:
                 try:
-                    Path(tex_file).unlink()
-                except IOError:
+                    Path(tex_file).unlink(missing_ok=True)
+                except OSError:
                     pass
             
             # Remove from list
@@ -207,7 +328,7 @@ def clear_history() -> bool:
     for tex_file in STORAGE_DIR.glob("*.tex"):
         try:
             tex_file.unlink()
-        except IOError:
+        except OSError:
             pass
     
     # Clear history file
@@ -235,11 +356,10 @@ def load_settings() -> dict:
         return defaults
     
     try:
-        with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-            settings = json.load(f)
+        settings = _read_json(SETTINGS_FILE)
         # Merge with defaults for any missing keys
         return {**defaults, **settings}
-    except (json.JSONDecodeError, IOError):
+    except (OSError, json.JSONDecodeError):
         return defaults
 
 
@@ -256,8 +376,7 @@ def save_settings(settings: dict) -> bool:
     ensure_storage_dir()
     
     try:
-        with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-            json.dump(settings, f, ensure_ascii=False, indent=2)
+        _write_json(SETTINGS_FILE, settings)
         return True
-    except IOError:
+    except OSError:
         return False
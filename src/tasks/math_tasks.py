@@ -4,7 +4,48 @@ Streamlined to 3 tasks: Plan → Write (with illustrations) → Edit & Validate.
 Writer produces body content + TikZ inline. Editor validates math and removes preamble.
 """
 
-from crewai import Task, Agent
+import re
+
+from crewai import Agent, Task
+
+# Preamble noise stripped from writer output before it reaches the editor
+_PREAMBLE_START_RE = re.compile(
+    r'^[ \t]*\\(?:documentclass|usepackage|newtcolorbox|usetikzlibrary|pgfplotsset|definecolor)\b',
+    re.MULTILINE
+)
+_BEGIN_DOCUMENT_RE = re.compile(r'\\begin\{document\}')
+_END_DOCUMENT_RE = re.compile(r'\\end\{document\}')
+_SECTION_MARKER_RE = re.compile(r'</?(?:PLAN|CONTENT)>')
+_FIGURE_PLACEHOLDER_RE = re.compile(r'\[INSERT FIGURE:[^\]]*\]')
+
+
+def strip_preamble(tex: str) -> str:
+    """
+    Remove the preamble, document wrappers and [INSERT FIGURE] placeholders.
+
+    Drops everything from the first preamble command (or the start) through
+    \\begin{document}, and everything after \\end{document} except
+    <PLAN>/<CONTENT> markers, so multi-line preamble definitions go as a
+    whole. Text without \\begin{document} keeps its preamble lines.
+    """
+    begin = _BEGIN_DOCUMENT_RE.search(tex)
+    if begin:
+        preamble = _PREAMBLE_START_RE.search(tex, 0, begin.start())
+        head = tex[:preamble.start()] if preamble else ''
+        body = tex[begin.end():]
+        end = _END_DOCUMENT_RE.search(body)
+        if end:
+            tail = ''.join(_SECTION_MARKER_RE.findall(body, end.end()))
+            body = body[:end.start()] + tail
+        tex = head + body
+    tex = _FIGURE_PLACEHOLDER_RE.sub('', tex)
+    return tex.strip()
+
+
+def _strip_preamble_from_output(output) -> None:
+    """Task callback: shrink the writer's output before the editor reads it as context."""
+    if getattr(output, "raw", None):
+        output.raw = strip_preamble(output.raw)
 
 
 class MathTasks:
@@ -13,6 +54,8 @@ class MathTasks:
       1. plan_content_task   — Pedagogue plans structure
       2. write_content_task  — Writer produces LaTeX body + TikZ (merged)
       3. edit_and_validate_task — Editor quality-checks, validates answers, strips preamble
+
+    Fast mode merges steps 1 and 2 into plan_and_write_task (one LLM round trip less).
     """
 
     # ------------------------------------------------------------------
@@ -29,6 +72,17 @@ class MathTasks:
         """
         Plan the pedagogical structure.
         """
+        description, expected_output = self._plan_prompt(grade, topic, content_type, content_options)
+        return Task(description=description, expected_output=expected_output, agent=agent)
+
+    def _plan_prompt(
+        self,
+        grade: str,
+        topic: str,
+        content_type: str,
+        content_options: dict = None
+    ) -> tuple[str, str]:
+        """Description and expected output of the planning step."""
         if content_options is None:
             content_options = {}
 
@@ -112,8 +166,8 @@ Matematisk nivå er UENDRET - bare språket er enklere.
         exercises_only = include_exercises and not include_theory and not include_examples
 
         if exercises_only:
-            return Task(
-                description=f"""
+            return (
+                f"""
 **RENT OPPGAVEARK - INGEN TEORI ELLER EKSEMPLER**
 
 **Klassetrinn:** {grade}
@@ -135,7 +189,7 @@ Planlegg KUN:
 IKKE planlegg teori, definisjoner eller eksempler.
 Alt på norsk (Bokmål).
 """,
-                expected_output=f"""
+                f"""
 Enkel plan for rent oppgaveark:
 - Tittel
 {"- LK20 kompetansemål" if competency_goals else ""}
@@ -143,13 +197,12 @@ Enkel plan for rent oppgaveark:
 {"- Tre nivåer: Lett, Middels, Vanskelig" if differentiation_mode else ""}
 {"- Notater om løsningsforslag" if include_solutions else ""}
 INGEN teori, definisjoner eller eksempler.
-""",
-                agent=agent
+"""
             )
 
         # ---- Full content mode ----
-        return Task(
-            description=f"""
+        return (
+            f"""
 Analyser og lag en detaljert pedagogisk plan:
 
 **Klassetrinn:** {grade}
@@ -175,7 +228,7 @@ Analyser og lag en detaljert pedagogisk plan:
 
 Alt på norsk (Bokmål).
 """,
-            expected_output=f"""
+            f"""
 Strukturert plan:
 - Tittel
 - LK20-kompetansemål
@@ -185,8 +238,7 @@ Strukturert plan:
   {"* Oppgaver (totalt " + str(num_exercises) + ")" if include_exercises else ""}
   {"* Illustrasjonsbehov" if include_graphs else ""}
 - Tidsestimat
-""",
-            agent=agent
+"""
         )
 
     # ------------------------------------------------------------------
@@ -204,6 +256,17 @@ Strukturert plan:
 
         CRITICAL: Output ONLY body content. NO \\documentclass, NO \\usepackage.
         """
+        description, expected_output = self._write_prompt(content_options)
+        return Task(
+            description=description,
+            expected_output=expected_output,
+            agent=agent,
+            context=[plan_task],
+            callback=_strip_preamble_from_output
+        )
+
+    def _write_prompt(self, content_options: dict = None) -> tuple[str, str]:
+        """Description and expected output of the writing step."""
         if content_options is None:
             content_options = {}
 
@@ -301,8 +364,8 @@ a) Svar ...
             else:
                 graphs_instruction = "IKKE inkluder figurer eller grafer."
 
-            return Task(
-                description=f"""
+            return (
+                f"""
 **RENT OPPGAVEARK - BARE OPPGAVER, INGEN PREAMBLE**
 
 === KRITISK: INGEN PREAMBLE ===
@@ -331,7 +394,7 @@ FORMATERING:
 - \\frac{{}}{{}} for brøker, \\cdot for multiplikasjon
 - Alt på norsk (Bokmål)
 """,
-                expected_output=f"""
+                f"""
 Rent LaTeX BODY-innhold (INGEN preamble) med:
 - \\title, \\author, \\date, \\maketitle
 {"- Kompetansemål" if competency_goals else ""}
@@ -340,9 +403,7 @@ Rent LaTeX BODY-innhold (INGEN preamble) med:
 {"- Løsningsforslag" if include_solutions else ""}
 INGEN teori, definisjoner, eksempler.
 INGEN \\documentclass eller \\usepackage.
-""",
-                agent=agent,
-                context=[plan_task]
+"""
             )
 
         # ---- Full content mode ----
@@ -417,11 +478,56 @@ FORMATERING:
             output_parts.append("- Løsningsforslag")
         output_parts.append("\nINGEN \\documentclass, \\usepackage, \\begin{document}.")
 
+        return "\n".join(task_parts), "\n".join(output_parts)
+
+    # ------------------------------------------------------------------
+    # TASK 1+2: Plan and Write in one call (Writer — fast mode)
+    # ------------------------------------------------------------------
+    def plan_and_write_task(
+        self,
+        agent: Agent,
+        grade: str,
+        topic: str,
+        content_type: str,
+        content_options: dict = None
+    ) -> Task:
+        """
+        Plan AND write in a single call, skipping the pedagogue round trip.
+
+        Reuses the plan and write prompts; the writer first emits a short
+        <PLAN>...</PLAN> block, then the LaTeX body in <CONTENT>...</CONTENT>.
+        """
+        plan_description, _ = self._plan_prompt(grade, topic, content_type, content_options)
+        write_description, write_output = self._write_prompt(content_options)
+
         return Task(
-            description="\n".join(task_parts),
-            expected_output="\n".join(output_parts),
+            description=f"""
+Du skal både PLANLEGGE og SKRIVE innholdet i ÉN omgang.
+
+=== STEG 1: PLAN (kort, maks 15 linjer) ===
+Skriv planen mellom <PLAN> og </PLAN>.
+{plan_description}
+
+=== STEG 2: INNHOLD ===
+Skriv det ferdige LaTeX-innholdet mellom <CONTENT> og </CONTENT>, basert på planen over.
+{write_description}
+
+OUTPUT-FORMAT (NØYAKTIG):
+<PLAN>
+...kort plan...
+</PLAN>
+<CONTENT>
+...komplett LaTeX body-innhold...
+</CONTENT>
+""",
+            expected_output=f"""
+<PLAN>Kort pedagogisk plan</PLAN>
+<CONTENT>
+{write_output}
+</CONTENT>
+""",
             agent=agent,
-            context=[plan_task]
+            callback=_strip_preamble_from_output
         )
 
     # ------------------------------------------------------------------
@@ -471,6 +577,9 @@ Hvis innholdet inneholder noe av dette, FJERN det:
 - \\end{{document}}
 - \\newtcolorbox, \\definecolor, \\newtheorem definisjoner
 
+Hvis innholdet er delt i <PLAN>...</PLAN> og <CONTENT>...</CONTENT>:
+bruk planen KUN som referanse, rediger KUN CONTENT-blokken, og fjern markørene.
+
 Innholdet skal starte DIREKTE med:
 \\title{{Tittel}}
 \\author{{Generert av MateMaTeX AI}}
@@ -510,6 +619,7 @@ For HVER oppgave med fasit:
 - \\begin{{document}} / \\end{{document}}
 - \\newtcolorbox / \\definecolor / \\newtheorem
 - [INSERT FIGURE: ...] plassholdere
+- <PLAN>/<CONTENT>-markører og plantekst
 - Markdown-syntaks
 
 OUTPUT: Rent LaTeX body-innhold klart for kompilering.
@@ -8,6 +8,7 @@ from .pdf_generator import (
     clean_ai_output,
     ensure_preamble,
     validate_latex_syntax,
+    warm_preamble_format,
     STANDARD_PREAMBLE
 )
 
@@ -162,6 +163,7 @@ from .exercise_bank import (
     save_exercises,
     extract_exercises_from_latex,
     add_exercise,
+    add_exercises,
     add_exercises_from_latex,
     get_exercise,
     delete_exercise,
@@ -324,6 +326,7 @@ __all__ = [
     "clean_ai_output",
     "ensure_preamble",
     "validate_latex_syntax",
+    "warm_preamble_format",
     "STANDARD_PREAMBLE",
     # Word tools
     "latex_to_word",
@@ -450,6 +453,7 @@ __all__ = [
     "save_exercises",
     "extract_exercises_from_latex",
     "add_exercise",
+    "add_exercises",
     "add_exercises_from_latex",
     "get_exercise",
     "delete_exercise",
@@ -157,7 +157,8 @@ def add_exercise(
     Returns:
         The created Exercise.
     """
-    exercise_id = f"ex_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{len(load_exercises())}"
+    exercises = load_exercises()
+    exercise_id = f"ex_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{len(exercises)}"
     
     exercise = Exercise(
         id=exercise_id,
@@ -173,13 +174,53 @@ def add_exercise(
         source=source
     )
     
-    exercises = load_exercises()
     exercises.insert(0, exercise)
     save_exercises(exercises)
     
     return exercise
 
 
+def add_exercises(items: list[dict], source: str = "generated") -> list[Exercise]:
+    """
+    Add several exercises with a single load and save of the bank.
+    
+    Args:
+        items: One dict per exercise with add_exercise's keyword arguments
+            (title, topic, grade_level, latex_content, and optionally
+            difficulty, solution, tags).
+        source: Where the exercises came from.
+    
+    Returns:
+        The created Exercises, in the order given.
+    """
+    exercises = load_exercises()
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    created_at = datetime.now().isoformat()
+    
+    created = [
+        Exercise(
+            id=f"ex_{timestamp}_{len(exercises) + i}",
+            title=item["title"],
+            topic=item["topic"],
+            grade_level=item["grade_level"],
+            difficulty=item.get("difficulty", "middels"),
+            latex_content=item["latex_content"],
+            solution=item.get("solution"),
+            tags=item.get("tags") or [],
+            created_at=created_at,
+            usage_count=0,
+            source=source
+        )
+        for i, item in enumerate(items)
+    ]
+    
+    # Same order as calling add_exercise once per item (newest first)
+    exercises[0:0] = reversed(created)
+    save_exercises(exercises)
+    
+    return created
+
+
 def add_exercises_from_latex(
     latex_content: str,
     topic: str,
@@ -197,21 +238,18 @@ def add_exercises_from_latex(
         List of created Exercise objects.
     """
     extracted = extract_exercises_from_latex(latex_content)
-    created = []
-    
-    for ex in extracted:
-        exercise = add_exercise(
-            title=ex["title"],
-            topic=topic,
-            grade_level=grade_level,
-            latex_content=ex["full_latex"],
-            difficulty=ex["difficulty"],
-            solution=ex["solution"],
-            source="generated"
-        )
-        created.append(exercise)
     
-    return created
+    return add_exercises([
+        {
+            "title": ex["title"],
+            "topic": topic,
+            "grade_level": grade_level,
+            "latex_content": ex["full_latex"],
+            "difficulty": ex["difficulty"],
+            "solution": ex["solution"],
+        }
+        for ex in extracted
+    ])
 
 
 def get_exercise(exercise_id: str) -> Optional[Exercise]:
@@ -176,9 +176,9 @@ def search_history(query: str) -> list[SearchResult]:
         history = load_history()
         
         for entry in history:
-            topic = entry.get("topic", "")
-            grade = entry.get("grade", "")
-            entry_id = entry.get("id", "")
+            topic = entry.topic
+            grade = entry.grade
+            entry_id = entry.id
             
             # Get LaTeX content if available
             tex_content = get_tex_content(entry_id) or ""
@@ -196,10 +196,10 @@ def search_history(query: str) -> list[SearchResult]:
                         title=topic,
                         snippet=extract_snippet(tex_content or topic, query),
                         relevance_score=score,
-                        created_at=entry.get("timestamp", ""),
+                        created_at=entry.timestamp,
                         metadata={
                             "grade": grade,
-                            "material_type": entry.get("material_type", ""),
+                            "material_type": entry.material_type,
                         }
                     ))
     except Exception:
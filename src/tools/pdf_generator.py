@@ -5,11 +5,13 @@ Compiles LaTeX content to PDF using pdflatex.
 
 import os
 import re
+import hashlib
 import logging
 import subprocess
 import tempfile
+import threading
+from collections import Counter
 from pathlib import Path
-from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -73,9 +75,6 @@ STANDARD_PREAMBLE = r"""\documentclass[a4paper,11pt]{article}
 \definecolor{mainGray}{RGB}{80, 80, 90}
 \definecolor{lightGray}{RGB}{248, 248, 252}
 
-% Hyperlinks (load AFTER color definitions to avoid undefined color errors)
-\usepackage[colorlinks=true, linkcolor=mainBlue, urlcolor=mainBlue, citecolor=mainGreen]{hyperref}
-
 % --- Shared box style ---
 \tcbset{matebox/.style={
   enhanced, breakable,
@@ -210,6 +209,14 @@ STANDARD_PREAMBLE = r"""\documentclass[a4paper,11pt]{article}
 % First page: no header/footer (clean title page)
 \fancypagestyle{plain}{\fancyhf{}\fancyfoot[C]{\small\color{mainGray}\thepage}\renewcommand{\headrulewidth}{0pt}}
 
+% End of the precompiled format (mylatexformat); \relax in a plain compile.
+% hyperref is loaded at run time, after it: it writes PDF settings that
+% must not be frozen into a dumped format
+\csname endofdump\endcsname
+
+% Hyperlinks (load AFTER color definitions to avoid undefined color errors)
+\usepackage[colorlinks=true, linkcolor=mainBlue, urlcolor=mainBlue, citecolor=mainGreen]{hyperref}
+
 """
 
 
@@ -239,7 +246,7 @@ def clean_ai_output(latex_content: str) -> str:
     """
     Clean up AI-generated LaTeX content.
     
-    1. Removes markdown code blocks
+    1. Removes <PLAN>/<CONTENT> markers and markdown code blocks
     2. Strips any preamble the AI generated (documentclass, usepackage, etc.)
     3. Extracts only the body content
     
@@ -254,6 +261,12 @@ def clean_ai_output(latex_content: str) -> str:
     """
     content = latex_content.strip()
     
+    # Step 0: Fast-mode output may still carry <PLAN>/<CONTENT> markers
+    content_match = re.search(r'<CONTENT>(.*?)(?:</CONTENT>|$)', content, re.DOTALL)
+    if content_match:
+        content = content_match.group(1).strip()
+    content = re.sub(r'<PLAN>.*?</PLAN>', '', content, flags=re.DOTALL).strip()
+    
     # Step 1: Remove markdown code blocks (```latex ... ``` or ``` ... ```)
     code_block_pattern = r'```(?:latex|tex)?\s*\n?(.*?)\n?```'
     matches = re.findall(code_block_pattern, content, re.DOTALL)
@@ -382,7 +395,7 @@ def ensure_preamble(latex_content: str) -> str:
 def compile_latex_to_pdf(
     latex_content: str,
     filename: str,
-    output_dir: Optional[str] = None,
+    output_dir: str | None = None,
     cleanup_aux: bool = True,
     max_retries: int = 3
 ) -> str:
@@ -440,8 +453,8 @@ def compile_latex_to_pdf(
 
     # Write the .tex file
     try:
-        tex_file.write_text(latex_content, encoding="utf-8")
-    except (OSError, IOError) as e:
+        tex_file.write_bytes(latex_content.encode("utf-8"))
+    except OSError as e:
         raise RuntimeError(f"Could not write .tex file: {e}")
     
     logger.info(f"LaTeX source saved to: {tex_file}")
@@ -457,27 +470,43 @@ def compile_latex_to_pdf(
             "After installation, restart your terminal/IDE."
         )
 
+    # Use the precompiled preamble format when the document starts with
+    # our standard preamble (skips reloading ~30 packages on every pass)
+    fmt_path = None
+    if latex_content.startswith(STANDARD_PREAMBLE):
+        fmt_path = _get_preamble_format(pdflatex_cmd, str(output_dir))
+    fmt_failed = None
+
     # Run pdflatex with retry logic
     last_error = None
     for attempt in range(max_retries):
         success = True
         
         # Run pdflatex (twice for proper cross-references)
-        for run_num in range(2):
+        run_num = 0
+        while run_num < 2:
             logger.info(f"Running pdflatex (attempt {attempt + 1}, pass {run_num + 1}/2)...")
             
+            cmd = [pdflatex_cmd]
+            env = None
+            if fmt_path:
+                fmt_dir, fmt_name = os.path.split(fmt_path)
+                cmd.append(f"-fmt={fmt_name}")
+                env = {**os.environ, "TEXFORMATS": fmt_dir + os.pathsep}
+            cmd += [
+                "-interaction=nonstopmode",
+                "-halt-on-error",
+                f"-output-directory={output_dir}",
+                str(tex_file)
+            ]
+
             try:
                 result = subprocess.run(
-                    [
-                        pdflatex_cmd,
-                        "-interaction=nonstopmode",
-                        "-halt-on-error",
-                        f"-output-directory={output_dir}",
-                        str(tex_file)
-                    ],
+                    cmd,
                     capture_output=True,
                     text=True,
                     cwd=output_dir,
+                    env=env,
                     timeout=180  # 3 minute timeout for complex TikZ
                 )
             except subprocess.TimeoutExpired:
@@ -488,17 +517,33 @@ def compile_latex_to_pdf(
             if result.returncode != 0:
                 error_msg = _extract_latex_errors(log_file, result.stdout)
                 last_error = error_msg
+
+                # Fall back to a plain compile within the same attempt, so
+                # the format never costs an auto-fix retry
+                if fmt_path:
+                    logger.info("Compile with precompiled preamble failed, retrying without it...")
+                    fmt_failed, fmt_path = fmt_path, None
+                    run_num = 0
+                    continue
                 
                 # Try to auto-fix common errors
                 if attempt < max_retries - 1:
                     fixed_content = _try_autofix_latex(latex_content, error_msg)
                     if fixed_content != latex_content:
                         latex_content = fixed_content
-                        tex_file.write_text(latex_content, encoding="utf-8")
+                        tex_file.write_bytes(latex_content.encode("utf-8"))
                         logger.info("Auto-fixed LaTeX issues, retrying...")
                 
                 success = False
                 break
+
+            run_num += 1
+
+            # The plain pass compiled what the format pass could not, so the
+            # format itself is broken or stale (e.g. after a TeX upgrade)
+            if fmt_failed:
+                _discard_preamble_format(pdflatex_cmd, str(output_dir), fmt_failed)
+                fmt_failed = None
         
         if success:
             break
@@ -525,8 +570,119 @@ def compile_latex_to_pdf(
     return str(pdf_file)
 
 
-def _find_pdflatex() -> Optional[str]:
-    """Find pdflatex executable on the system."""
+def warm_preamble_format(output_dir: str | None = None) -> None:
+    """
+    Build the precompiled preamble format ahead of the first compile.
+
+    Meant to run in the background while the agents are still writing, so
+    the one-off format dump overlaps the LLM calls instead of adding to the
+    first compile. A no-op without pdflatex or once the format exists.
+    """
+    if output_dir is None:
+        output_dir = Path(__file__).parent.parent.parent / "output"
+    pdflatex_cmd = _find_pdflatex()
+    if pdflatex_cmd:
+        _get_preamble_format(pdflatex_cmd, str(Path(output_dir)))
+
+
+# Serializes format builds, so two threads (a warm-up and a compile) never
+# dump the same format file at once. Failures are remembered as None, so a
+# host without mylatexformat pays for the failed build once per process.
+_FORMAT_LOCK = threading.Lock()
+_FORMAT_PATHS: dict[tuple[str, str], str | None] = {}
+
+
+def _get_preamble_format(pdflatex_cmd: str, output_dir: str) -> str | None:
+    """
+    Dump STANDARD_PREAMBLE into a pdflatex format file (mylatexformat).
+
+    Built once per preamble version and reused by every later compile, so
+    pdflatex only typesets the body instead of reloading the preamble.
+
+    Returns:
+        Path to the format file without extension, or None if it could not be built.
+    """
+    key = (pdflatex_cmd, output_dir)
+    if key in _FORMAT_PATHS:
+        return _FORMAT_PATHS[key]
+
+    fmt_dir = Path(output_dir) / ".fmt"
+    preamble_hash = hashlib.md5(STANDARD_PREAMBLE.encode()).hexdigest()[:8]
+    jobname = f"matematex_{preamble_hash}"
+    fmt_file = fmt_dir / f"{jobname}.fmt"
+
+    with _FORMAT_LOCK:
+        if key in _FORMAT_PATHS:
+            return _FORMAT_PATHS[key]
+        fmt_path = None
+        if fmt_file.exists() or _build_preamble_format(pdflatex_cmd, fmt_dir, jobname):
+            fmt_path = str(fmt_dir / jobname)
+        else:
+            logger.info("Preamble format unavailable (mylatexformat missing?), using plain compile")
+        _FORMAT_PATHS[key] = fmt_path
+    return fmt_path
+
+
+def _discard_preamble_format(pdflatex_cmd: str, output_dir: str, fmt_path: str) -> None:
+    """Delete a format that broke a compile and stop using it in this process."""
+    logger.warning(f"Discarding precompiled preamble format {fmt_path}.fmt")
+    with _FORMAT_LOCK:
+        Path(f"{fmt_path}.fmt").unlink(missing_ok=True)
+        _FORMAT_PATHS[(pdflatex_cmd, output_dir)] = None
+
+
+def _build_preamble_format(pdflatex_cmd: str, fmt_dir: Path, jobname: str) -> bool:
+    """Run pdflatex -ini with mylatexformat to dump STANDARD_PREAMBLE; True on success."""
+    fmt_file = fmt_dir / f"{jobname}.fmt"
+    try:
+        fmt_dir.mkdir(parents=True, exist_ok=True)
+        source = fmt_dir / f"{jobname}.tex"
+        source.write_text(
+            STANDARD_PREAMBLE + "\\begin{document}\n\\end{document}\n", encoding="utf-8"
+        )
+        result = subprocess.run(
+            [
+                pdflatex_cmd,
+                "-ini",
+                f"-jobname={jobname}",
+                "-interaction=nonstopmode",
+                "&pdflatex",
+                "mylatexformat.ltx",
+                source.name,
+            ],
+            capture_output=True,
+            text=True,
+            cwd=fmt_dir,
+            timeout=120
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.info(f"Could not build preamble format: {e}")
+        fmt_file.unlink(missing_ok=True)
+        return False
+
+    # nonstopmode dumps a format even after a preamble error; never keep it
+    if result.returncode != 0:
+        logger.info(f"Preamble format build failed (exit code {result.returncode})")
+        fmt_file.unlink(missing_ok=True)
+        return False
+    return fmt_file.exists()
+
+
+# pdflatex location once found; a miss is probed again (TeX may be
+# installed while the app is running)
+_PDFLATEX_CMD: str | None = None
+
+
+def _find_pdflatex() -> str | None:
+    """Find pdflatex executable on the system (remembered once found)."""
+    global _PDFLATEX_CMD
+    if _PDFLATEX_CMD is None:
+        _PDFLATEX_CMD = _probe_pdflatex()
+    return _PDFLATEX_CMD
+
+
+def _probe_pdflatex() -> str | None:
+    """Look for pdflatex on PATH and in common Windows install locations."""
     import shutil
     
     if shutil.which("pdflatex"):
@@ -716,6 +872,9 @@ def _cleanup_auxiliary_files(output_dir: Path, filename: str) -> None:
                 pass
 
 
+_ENV_MARKER_RE = re.compile(r'\\(begin|end)\{([^}]*)\}')
+
+
 def validate_latex_syntax(latex_content: str) -> tuple[bool, list[str]]:
     """
     Perform basic validation of LaTeX syntax.
@@ -748,10 +907,11 @@ def validate_latex_syntax(latex_content: str) -> tuple[bool, list[str]]:
         "definisjon", "eksempel", "merk", "losning",
         "multicols", "tcolorbox",
     ]
+    # One pass over the document for all \begin/\end markers
+    markers = Counter(_ENV_MARKER_RE.findall(latex_content))
     for env in environments:
-        # Count begins (ignoring optional args)
-        opens = len(re.findall(rf'\\begin\{{{re.escape(env)}\}}', latex_content))
-        closes = latex_content.count(f"\\end{{{env}}}")
+        opens = markers[("begin", env)]
+        closes = markers[("end", env)]
         if opens != closes:
             issues.append(f"Unmatched {env} environment: {opens} begin, {closes} end")
 